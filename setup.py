@@ -1,3 +1,6 @@
-from distutils.core import setup
+try:
+    from setuptools import setup
+except ImportError:
+    from distutils.core import setup
 
 setup(name='yametrikapy', version='1.0', packages=['yametrikapy'])
@@ -0,0 +1,47 @@
+# -*- coding: UTF-8 -*-
+
+import socket
+import unittest
+
+from yametrikapy.breaker import Breakers, CircuitOpenError, HALF_OPEN, OPEN
+from yametrikapy.client import Cancelled, DeadlineExceeded
+from yametrikapy.core import Metrika
+
+
+class BreakerTest(unittest.TestCase):
+    def setUp(self):
+        # accepts the connections and never answers
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(16)
+        self.metrika = Metrika('', token='token')
+        self.metrika.HOST = 'http://127.0.0.1:%d/' % self.server.getsockname()[1]
+        self.metrika.Breakers = Breakers(min_requests=2, window=2)
+
+    def tearDown(self):
+        self.server.close()
+
+    def testSlowEndpoint(self):
+        for i in range(2):
+            with self.metrika.WithDeadline(0.2):
+                self.assertRaises(DeadlineExceeded, self.metrika.GetCounterList)
+        self.assertEqual(self.metrika.Breakers.States(), {'counters': OPEN})
+        with self.metrika.WithDeadline(0.2):
+            self.assertRaises(CircuitOpenError, self.metrika.GetCounterList)
+
+    def testCancelledTrial(self):
+        breaker = self.metrika.Breakers.Get('counters')
+        breaker.state = OPEN
+        breaker.reset_timeout = 0
+        with self.metrika.WithDeadline() as deadline:
+            deadline.cancel()
+            self.assertRaises(Cancelled, self.metrika.GetCounterList)
+        self.assertEqual(breaker.state, HALF_OPEN)
+        # the next call is the trial
+        with self.metrika.WithDeadline(0.2):
+            self.assertRaises(DeadlineExceeded, self.metrika.GetCounterList)
+        self.assertEqual(breaker.state, OPEN)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+# -*- coding: UTF-8 -*-
+
+import json
+import threading
+import unittest
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from yametrikapy.client import ResponseCache
+from yametrikapy.core import Metrika
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        etag = '"%s"' % self.path
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps({'delegates': [{'user_login': 'a'}],
+            'data': [{'visits': 1}]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), _Handler)
+        self.server.paths = []
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.metrika = Metrika('', token='token')
+        self.metrika.HOST = 'http://127.0.0.1:%d/' % self.server.server_port
+        self.metrika.Cache = ResponseCache()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def testGetWithoutParams(self):
+        first = self.metrika.GetDelegates()
+        first.delegates.append({'user_login': 'b'})
+        second = self.metrika.GetDelegates()
+        self.assertEqual(self.metrika._client.Status, 304)
+        self.assertEqual(second.delegates, [{'user_login': 'a'}])
+        self.assertEqual(len(self.server.paths), 2)
+
+    def testNextPage(self):
+        next = self.metrika.HOST + 'stat/traffic/summary.json?id=1&offset=101'
+        first = self.metrika.GetStatTrafficSummary(1, next=next)
+        first.data.append({'visits': 2})
+        second = self.metrika.GetStatTrafficSummary(1, next=next)
+        self.assertEqual(self.metrika._client.Status, 304)
+        self.assertEqual(second.data, [{'visits': 1}])
+
+
+if __name__ == '__main__':
+    unittest.main()
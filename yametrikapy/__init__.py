@@ -2,4 +2,4 @@
 
 __author__ = 'Sergey Pikhovkin <s@pikhovkin.ru>'
 
-from core import Metrika
+from .core import Metrika
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        breaker
+# Purpose:     Circuit breakers for the endpoints of the API
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+import re
+import threading
+import time
+from collections import deque
+
+from .compat import urlsplit
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitOpenError(Exception):
+    """
+    The endpoint fails too often, the request is not sent.
+    """
+    pass
+
+
+_NUMBER = re.compile(r'/\d+(?=/|$)')
+
+
+def GetBreakerKey(uri):
+    """
+    Returns the endpoint of the URI without the host, the format and
+    the numbers of objects: 'counter/%d/goals', 'stat/sources/phrases'.
+    """
+    path = urlsplit(uri).path
+    if path.endswith('.json'):
+        path = path[:-len('.json')]
+    return _NUMBER.sub('/%d', path).strip('/')
+
+
+class CircuitBreaker(object):
+    """
+    Opens after the share of failures of the last window requests is over
+    failure_rate (and there are at least min_requests of them). While it's
+    open the requests fail at once; after reset_timeout one trial request
+    is let through (half-open), its success closes the breaker.
+    """
+    def __init__(self, failure_rate=0.5, min_requests=10, window=20,
+        reset_timeout=30):
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.opened = 0.0
+        self._results = deque(maxlen=window)
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def _Allow(self):
+        with self._lock:
+            if self.state == OPEN:
+                if time.time() - self.opened < self.reset_timeout:
+                    return False
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._trial:
+                    return False
+                self._trial = True
+            return True
+
+    def _Record(self, success):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trial = False
+                self._results.clear()
+                if success:
+                    self.state = CLOSED
+                else:
+                    self.state = OPEN
+                    self.opened = time.time()
+                return
+            self._results.append(success)
+            failures = self._results.count(False)
+            if (len(self._results) >= self.min_requests) and \
+                (float(failures) / len(self._results) >= self.failure_rate):
+                self.state = OPEN
+                self.opened = time.time()
+
+    def _Release(self):
+        # the call says nothing about the endpoint, the next one is the trial
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trial = False
+
+    def Call(self, f, is_failure=None):
+        """
+        is_failure(exception) tells whether the exception is a failure of
+        the endpoint, by default every exception is. If it returns None,
+        the call is not counted at all.
+        """
+        if not self._Allow():
+            raise CircuitOpenError('Circuit is %s' % self.state)
+        try:
+            result = f()
+        except Exception as e:
+            failure = True if is_failure is None else is_failure(e)
+            if failure is None:
+                self._Release()
+            else:
+                self._Record(not failure)
+            raise
+        self._Record(True)
+        return result
+
+
+class Breakers(object):
+    """
+    Circuit breakers by endpoint, created on the first request.
+
+    metrika.Breakers = Breakers(failure_rate=0.5, reset_timeout=30)
+    """
+    def __init__(self, **settings):
+        self.settings = settings
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def Get(self, key):
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(**self.settings)
+            return breaker
+
+    def Call(self, key, f, is_failure=None):
+        try:
+            return self.Get(key).Call(f, is_failure)
+        except CircuitOpenError as e:
+            raise CircuitOpenError('%s: %s' % (key, e))
+
+    def States(self):
+        with self._lock:
+            return dict([(key, breaker.state)
+                for key, breaker in self._breakers.items()])
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        bundle
+# Purpose:     Several reports of one counter joined on date into one table
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+import datetime
+from collections import OrderedDict
+
+from .compat import integer_types
+from .paging import IterPages
+
+
+DATE_FORMAT = '%Y%m%d'
+
+
+def ParseDate(date):
+    if isinstance(date, datetime.date):
+        return date
+    return datetime.datetime.strptime(str(date), DATE_FORMAT).date()
+
+
+def GetPeriods(date1, date2, group='day'):
+    """
+    Splits the dates on the periods of group ('day', 'week', 'month'),
+    returns the list of (first, last) dates as 'YYYYMMDD'.
+    """
+    date1 = ParseDate(date1)
+    date2 = ParseDate(date2)
+    periods = []
+    start = date1
+    while start <= date2:
+        if group == 'week':
+            end = start + datetime.timedelta(days=6 - start.weekday())
+        elif group == 'month':
+            next_month = (start.replace(day=28) + datetime.timedelta(days=4))
+            end = next_month.replace(day=1) - datetime.timedelta(days=1)
+        else:
+            end = start
+        end = min(end, date2)
+        periods.append((start.strftime(DATE_FORMAT), end.strftime(DATE_FORMAT)))
+        start = end + datetime.timedelta(days=1)
+    return periods
+
+
+class BundleReport(object):
+    """
+    Report of the bundle.
+
+    name - prefix of the columns.
+    method - name of the Metrika.GetStat* method.
+    grouped - the report has the group parameter and the rows by date,
+        otherwise its rows are turned into the columns by the pivot field.
+    data - fields of the response with the rows.
+    """
+    def __init__(self, name, method, grouped=False, data=('data',), pivot='name'):
+        self.name = name
+        self.method = method
+        self.grouped = grouped
+        self.data = data
+        self.pivot = pivot
+
+
+REPORTS = (
+    BundleReport('traffic', 'GetStatTrafficSummary', grouped=True),
+    BundleReport('load', 'GetStatTrafficLoad', grouped=True),
+    BundleReport('deepness', 'GetStatTrafficDeepness',
+        data=('data_depth', 'data_time')),
+    BundleReport('sources', 'GetStatSourcesSummary'),
+)
+
+# Maximum number of the periods of the reports without group, every period
+# is a request of every such report
+MAX_PERIODS = 62
+
+
+class WideTable(object):
+    """
+    Column-oriented table: keys (dates) and the lists of values with
+    the same length for every column. Missing values are None. The values
+    for the whole range of dates are in totals.
+    """
+    def __init__(self, key='date'):
+        self.key = key
+        self.keys = []
+        self.columns = OrderedDict()
+        self.totals = OrderedDict()
+        self._index = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def Set(self, key, column, value):
+        i = self._index.get(key)
+        if i is None:
+            i = self._index[key] = len(self.keys)
+            self.keys.append(key)
+            for values in self.columns.values():
+                values.append(None)
+        values = self.columns.get(column)
+        if values is None:
+            values = self.columns[column] = [None] * len(self.keys)
+        values[i] = value
+
+    def Column(self, name):
+        return self.columns[name]
+
+    def Sort(self):
+        order = sorted(range(len(self.keys)), key=self.keys.__getitem__)
+        self.keys = [self.keys[i] for i in order]
+        for name, values in self.columns.items():
+            self.columns[name] = [values[i] for i in order]
+        self._index = dict([(key, i) for i, key in enumerate(self.keys)])
+
+    def Rows(self):
+        """
+        Yields the rows as dicts, only for the convenience.
+        """
+        names = list(self.columns)
+        for i, key in enumerate(self.keys):
+            row = dict([(name, self.columns[name][i]) for name in names])
+            row[self.key] = key
+            yield row
+
+
+def IsNumber(value):
+    return isinstance(value, integer_types + (float,)) and not isinstance(value, bool)
+
+
+def GetReportBundle(metrika, id, date1, date2, group='day', reports=REPORTS,
+    goal_id=None, pivots=False, max_periods=MAX_PERIODS):
+    """
+    Requests the reports of the counter in the thread pool of metrika and
+    joins them on date into WideTable as the responses come, one request
+    per report. Columns are named 'report.field' for the grouped reports and
+    'report.pivot.field' for the others, which go to the totals of the whole
+    range.
+
+    With pivots=True the reports without group are requested for every
+    period of group and become the columns by date too, that is one request
+    per report and period; more than max_periods periods raise ValueError.
+
+    table = GetReportBundle(metrika, id, '20120101', '20120131')
+    visits = table.Column('traffic.visits')
+    """
+    periods = [(date1, date2)]
+    if pivots:
+        periods = GetPeriods(date1, date2, group)
+        if len(periods) > max_periods:
+            raise ValueError('%d periods of "%s" are more than %d' %
+                (len(periods), group, max_periods))
+    tasks = []
+    for report in reports:
+        if report.grouped:
+            tasks.append((report, date1, date2))
+        else:
+            for first, last in periods:
+                tasks.append((report, first, last))
+
+    def fetch(task):
+        report, first, last = task
+        kwargs = {'date1': first, 'date2': last}
+        if report.grouped:
+            kwargs['group'] = group
+        if (goal_id is not None) and (report.method != 'GetStatTrafficLoad'):
+            kwargs['goal_id'] = goal_id
+        method = getattr(metrika, report.method)
+        if report.grouped:
+            return list(IterPages(method, id, **kwargs))
+        return [method(id, **kwargs)]
+
+    table = WideTable()
+    for i, pages in enumerate(metrika._IMap(fetch, tasks)):
+        report, first, last = tasks[i]
+        for page in pages:
+            for data in report.data:
+                name = report.name
+                if len(report.data) > 1:
+                    name = '%s.%s' % (name, data)
+                for row in getattr(page, data, None) or []:
+                    if report.grouped:
+                        key = row.get('date')
+                        prefix = name
+                    else:
+                        key = first
+                        prefix = '%s.%s' % (name, row.get(report.pivot))
+                    for field, value in row.items():
+                        if not IsNumber(value):
+                            continue
+                        column = '%s.%s' % (prefix, field)
+                        if report.grouped or pivots:
+                            table.Set(key, column, value)
+                        else:
+                            table.totals[column] = value
+    table.Sort()
+    return table
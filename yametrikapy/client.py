@@ -12,17 +12,250 @@
 # Licence:     MIT
 #-------------------------------------------------------------------------------
 
-import gzip
-import httplib
-from urllib import urlencode
-from urlparse import urlparse
-from StringIO import StringIO
+import socket
+import ssl
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+
+from .compat import httplib, queue, urlencode, urlparse, string_types, text_type
 
 
 class UnsupportedScheme(httplib.HTTPException):
     pass
 
 
+class RequestTimeout(httplib.HTTPException):
+    """
+    The server didn't answer in the connect or read timeout.
+    """
+    pass
+
+
+class DeadlineExceeded(RequestTimeout):
+    pass
+
+
+class DeadlineTimeout(DeadlineExceeded):
+    """
+    The server didn't answer before the deadline of the call.
+    """
+    pass
+
+
+class Cancelled(httplib.HTTPException):
+    pass
+
+
+class Deadline(object):
+    """
+    Time limit of the call which can span several requests (pages,
+    parallel requests). It can be cancelled from another thread, the call
+    stops before the next request.
+    """
+    # how often the waiters check the deadline, seconds
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, timeout=None):
+        self.expires = None if timeout is None else time.time() + timeout
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def remaining(self):
+        """
+        Seconds left, None if there is no time limit.
+        """
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.time())
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled('The call is cancelled')
+        if (self.expires is not None) and (time.time() >= self.expires):
+            raise DeadlineExceeded('The deadline of the call is exceeded')
+
+    def wait(self, event):
+        """
+        Waits for the threading.Event, raises Cancelled or DeadlineExceeded
+        if the deadline comes first.
+        """
+        while not event.is_set():
+            self.check()
+            event.wait(self.POLL_INTERVAL)
+
+
+class CacheEntry(object):
+    """
+    Body of the response with its validators.
+    """
+    def __init__(self, body, etag='', last_modified=''):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class ResponseCache(object):
+    """
+    Keeps the bodies of GET responses which have ETag or Last-Modified,
+    so the next requests are conditional. The least recently used entries
+    are dropped after max_entries.
+    """
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _HedgeConnections(list):
+    """
+    The connections of one of the hedged requests. Once they are closed,
+    the request can't open new ones.
+    """
+    def __init__(self):
+        list.__init__(self)
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def append(self, connection):
+        with self._lock:
+            if self.closed:
+                raise Cancelled('The other hedged request has won')
+            list.append(self, connection)
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            connections = list(self)
+        for connection in connections:
+            connection.close()
+
+
+class HedgePolicy(object):
+    """
+    Settings and statistics of the hedged GET requests: when the response
+    doesn't come in the percentile of the recent latencies, the same request
+    is sent on another connection and the first response wins. Not more
+    than max_rate of the requests are hedged.
+
+    When the hedge wins, the first request is closed at once, the time
+    saved is estimated by the recent latencies longer than the one of
+    the call.
+    """
+    def __init__(self, percentile=95, min_delay=0.05, max_rate=0.05,
+        window=200, min_samples=20):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedges = 0
+        # the hedge answered before the first request
+        self.wins = 0
+        # estimated seconds the winning hedges answered before the first
+        # requests
+        self.saved = 0.0
+        self.measured = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """
+        Seconds to wait before the hedge, None - don't hedge yet.
+        """
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        i = min(len(latencies) - 1, len(latencies) * self.percentile // 100)
+        return max(self.min_delay, latencies[i])
+
+    def start(self):
+        with self._lock:
+            self.requests += 1
+
+    def allow(self):
+        with self._lock:
+            if self.hedges + 1 > self.max_rate * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def expected(self, elapsed):
+        """
+        Returns the mean of the recent latencies longer than elapsed, it's
+        the expected latency of the request which hasn't answered in elapsed
+        seconds. None - there are no such latencies.
+        """
+        with self._lock:
+            latencies = [latency for latency in self._latencies
+                if latency > elapsed]
+        if not latencies:
+            return None
+        return sum(latencies) / len(latencies)
+
+    def record(self, latency, hedge_won=False):
+        with self._lock:
+            self._latencies.append(latency)
+            if hedge_won:
+                self.wins += 1
+
+    def record_saving(self, seconds):
+        with self._lock:
+            self.saved += seconds
+            self.measured += 1
+
+    def stats(self):
+        """
+        Returns the counts of requests, hedges and wins of the hedges,
+        the estimated time saved by the wins (total and average of
+        the estimated ones) and the median and p99 latencies of
+        the responses, seconds.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            result = {
+                'requests': self.requests,
+                'hedges': self.hedges,
+                'wins': self.wins,
+                'saved': self.saved,
+                'avg_saved': (self.saved / self.measured) if self.measured
+                    else None
+            }
+        for name, p in (('p50', 50), ('p99', 99)):
+            result[name] = latencies[min(len(latencies) - 1,
+                len(latencies) * p // 100)] if latencies else None
+        return result
+
+
 class APIClient(object):
     """
     """
@@ -49,6 +282,23 @@ class APIClient(object):
     def __init__(self):
         self.Status = int(0)
         self.Reason = str()
+        # ResponseCache for the conditional GET requests
+        self.cache = None
+        # cache entry of the last response, if it was cached or revalidated
+        self.cache_entry = None
+        # seconds, None - wait forever
+        self.connect_timeout = None
+        self.read_timeout = None
+        # Deadline of the current call
+        self.deadline = None
+        # HedgePolicy for GET requests, None - no hedging
+        self.hedging = None
+        # reused for the gzipped bodies of the responses of this client
+        self._buffer = bytearray()
+        # GET requests reuse the connection of the previous one to the host
+        self.keep_alive = False
+        self._connection = None
+        self._connection_key = None
 
     def _get_scheme(self, uri):
         if not uri.scheme or (uri.scheme == 'http'):
@@ -83,26 +333,95 @@ class APIClient(object):
             connection = httplib.HTTPSConnection(host, port=port)
         else:
             connection = httplib.HTTPConnection(host, port)
+        timeout = self._get_timeout(self.connect_timeout)
+        if timeout is not None:
+            connection.timeout = timeout
         return connection
 
+    def _get_timeout(self, timeout):
+        """
+        The timeout limited by the rest of the deadline.
+        """
+        if self.deadline is None:
+            return timeout
+        self.deadline.check()
+        remaining = self.deadline.remaining()
+        if remaining is None:
+            return timeout
+        if timeout is None:
+            return remaining
+        return min(timeout, remaining)
+
+    def _timeout_error(self, url):
+        if (self.deadline is not None) and (self.deadline.remaining() == 0):
+            return DeadlineTimeout('The deadline of the call is exceeded: %s' % url)
+        return RequestTimeout('Timed out: %s' % url)
+
     def _gunzip(self, stream):
-        gz = gzip.GzipFile(fileobj=StringIO(stream))
-        return gz.read()
+        # one call of zlib releases the GIL for the whole body
+        return zlib.decompress(stream, 16 + zlib.MAX_WBITS)
 
     def get_header(self, key, default=''):
         return self._response.getheader(key, default)
 
-    def _http_request(self, method, uri, params='', headers={}):
-        if isinstance(uri, (str, unicode)):
+    def _kept_connection(self, uri):
+        """
+        Returns the open connection of the previous request to the same
+        scheme, host and port or None.
+        """
+        key = (self._get_scheme(uri), self._get_port(uri))
+        if key != self._connection_key:
+            self.close_connection()
+            self._connection_key = key
+            return None
+        connection = self._connection
+        if (connection is not None) and (connection.sock is None):
+            # the server has asked to close it after the last response
+            connection.connect()
+        return connection
+
+    def close_connection(self):
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = None
+
+    def _http_request(self, method, uri, params='', headers={}, connections=None):
+        if isinstance(uri, string_types):
             uri = urlparse(uri)
         else:
             raise TypeError('Invalid URL')
 
+        keep = self.keep_alive and (method == 'GET') and (connections is None)
+        if keep:
+            connection = self._kept_connection(uri)
+            if connection is not None:
+                try:
+                    return self._send(connection, method, uri, params, headers)
+                except socket.timeout:
+                    self.close_connection()
+                    raise
+                except (httplib.HTTPException, socket.error):
+                    # the server has closed the idle connection, GET is safe
+                    # to repeat on a new one
+                    self.close_connection()
+
         connection = self._get_connection(uri)
+        if connections is not None:
+            connections.append(connection)
+        if keep:
+            self._connection = connection
 
         if self.debug:
             connection.debuglevel = 1
 
+        connection.connect()
+        return self._send(connection, method, uri, params, headers)
+
+    def _send(self, connection, method, uri, params, headers):
+        timeout = self._get_timeout(self.read_timeout)
+        if timeout is not None:
+            connection.sock.settimeout(timeout)
+
         query = uri.path
         if uri.query:
             query += '?%s' % uri.query
@@ -111,8 +430,11 @@ class APIClient(object):
             params = ''
         connection.putrequest(method, query)
 
+        if isinstance(params, text_type):
+            params = params.encode('utf-8')
+
         # Send the HTTP headers.
-        for name, value in headers.iteritems():
+        for name, value in headers.items():
             connection.putheader(name, value)
 
         if method in ('POST', 'PUT'):
@@ -129,17 +451,129 @@ class APIClient(object):
 
         return connection.getresponse()
 
+    def _fetch(self, method, url, params, headers, connections=None):
+        """
+        Returns the response and its body, which is decompressed. Without
+        connections (not a hedged request) the gzipped body of known length
+        is read into the buffer of the client and decompressed from it.
+        """
+        response = self._http_request(method, url, params, headers, connections)
+        encoding = response.getheader('Content-Encoding') or ''
+        if encoding.find('gzip') == -1:
+            return response, response.read()
+        length = response.getheader('Content-Length')
+        if (connections is None) and length and hasattr(response, 'readinto'):
+            return response, self._gunzip(self._read_into_buffer(response,
+                int(length)))
+        return response, self._gunzip(response.read())
+
+    def _read_into_buffer(self, response, length):
+        if len(self._buffer) < length:
+            self._buffer = bytearray(length)
+        view = memoryview(self._buffer)[:length]
+        size = 0
+        while size < length:
+            n = response.readinto(view[size:])
+            if not n:
+                break
+            size += n
+        return view[:size]
+
+    def _hedged_fetch(self, url, params, headers):
+        policy = self.hedging
+        policy.start()
+        results = queue.Queue()
+        connections = (_HedgeConnections(), _HedgeConnections())
+        started = [time.time(), None]
+
+        def fetch(i):
+            try:
+                result = (i, self._fetch('GET', url, params, headers,
+                    connections[i]), None)
+            except Exception as e:
+                result = (i, None, e)
+            results.put(result)
+
+        def start(i):
+            started[i] = time.time()
+            thread = threading.Thread(target=fetch, args=(i,))
+            thread.daemon = True
+            thread.start()
+
+        start(0)
+        result = None
+        delay = policy.delay()
+        if delay is not None:
+            try:
+                result = results.get(timeout=delay)
+            except queue.Empty:
+                pass
+        hedged = (result is None) and (delay is not None) and policy.allow()
+        if hedged:
+            start(1)
+        if result is None:
+            result = results.get()
+        if hedged and (result[2] is not None):
+            # the other request may still succeed
+            result = results.get()
+
+        i, response, error = result
+        latency = time.time() - started[0]
+        if hedged:
+            # the loser is not needed any more
+            connections[1 - i].close()
+        if error is not None:
+            raise error
+        if hedged and (i == 1):
+            expected = policy.expected(latency)
+            if expected is not None:
+                policy.record_saving(expected - latency)
+        policy.record(latency, hedge_won=(i == 1))
+        return response
+
     def request(self, method, url, params={}, headers={}):
         if not headers:
             headers = self.HEADERS
-        if params and isinstance(params, dict):
+        if isinstance(params, dict):
             params = urlencode(params)
-        self._response = self._http_request(method, url, params, headers)
-        self.Status = self._response.status
-        self.Reason = self._response.reason
-
-        page = self._response.read()
-        s = self._response.getheader('Content-Encoding')
-        if s and (s.find('gzip') > -1):
-            page = self._gunzip(page)
+
+        key = None
+        entry = None
+        if (method == 'GET') and (self.cache is not None):
+            key = (url, params, headers.get('Authorization', ''))
+            entry = self.cache.get(key)
+            if entry is not None:
+                headers = dict(headers)
+                if entry.etag:
+                    headers['If-None-Match'] = entry.etag
+                if entry.last_modified:
+                    headers['If-Modified-Since'] = entry.last_modified
+
+        try:
+            if (method == 'GET') and (self.hedging is not None):
+                self._response, page = self._hedged_fetch(url, params, headers)
+            else:
+                self._response, page = self._fetch(method, url, params, headers)
+            self.Status = self._response.status
+            self.Reason = self._response.reason
+            self.cache_entry = None
+        except socket.timeout:
+            self.close_connection()
+            raise self._timeout_error(url)
+        except ssl.SSLError as e:
+            self.close_connection()
+            # read timeouts of ssl sockets are raised as SSLError
+            if 'timed out' not in str(e):
+                raise
+            raise self._timeout_error(url)
+        if (self.Status == 304) and (entry is not None):
+            self.cache_entry = entry
+            return entry.body
+
+        if (key is not None) and (self.Status == 200):
+            etag = self.get_header('ETag')
+            last_modified = self.get_header('Last-Modified')
+            if etag or last_modified:
+                self.cache_entry = CacheEntry(page, etag, last_modified)
+                self.cache.put(key, self.cache_entry)
         return page
@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        columnar
+# Purpose:     Memory-mapped columnar files of the exported reports
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+import mmap
+import os
+import struct
+
+from simplejson import dumps, loads
+
+from .compat import replace, integer_types, string_types, text_type
+from .encoding import Dictionary
+from .paging import IterRows
+
+
+# The table is a directory:
+#   meta.json     - fields, types, number of rows and the blocks of rows
+#                   [counter id, date, start, end]
+#   <field>.col   - little-endian 8-byte values of every row: doubles
+#                   (NaN is null) or codes of strings (-1 is null)
+#   strings.dat   - the strings of the dictionary in UTF-8
+#   strings.idx   - the end offsets of the strings in strings.dat
+NUMBER = 'd'
+STRING = 'q'
+
+_WIDTH = 8
+_NULL_CODE = -1
+_NAN = float('nan')
+
+
+def _Pack(type, values):
+    return struct.pack('<%d%s' % (len(values), type), *values)
+
+
+def _GetType(value):
+    if isinstance(value, (bool, float) + integer_types):
+        return NUMBER
+    return STRING
+
+
+def _ColumnPath(path, name):
+    return os.path.join(path, '%s.col' % name)
+
+
+class ColumnarWriter(object):
+    """
+    Appends the rows of the reports to the columnar table at path. Numbers
+    are stored as doubles, other values as the codes of the dictionary
+    (lists and dicts as JSON). The rows of the same counter and date make
+    a block of the index, so the readers slice them without a scan.
+
+    writer = ColumnarWriter('phrases')
+    writer.Fetch(metrika.GetStatSourcesPhrases, id, '20120101', '20120131')
+    writer.Close()
+    """
+    def __init__(self, path):
+        self.path = path
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.meta = {'fields': [], 'types': {}, 'rows': 0, 'blocks': [],
+            'strings': 0}
+        meta = os.path.join(path, 'meta.json')
+        if os.path.exists(meta):
+            with open(meta, 'rb') as f:
+                self.meta = loads(f.read())
+        self.dictionary = Dictionary()
+        self._LoadStrings()
+        self._columns = {}
+        for name in self.meta['fields']:
+            self._columns[name] = self._Open(_ColumnPath(path, name),
+                self.meta['rows'] * _WIDTH)
+        self._strings = self._Open(os.path.join(path, 'strings.dat'),
+            self._strings_size)
+        self._offsets = self._Open(os.path.join(path, 'strings.idx'),
+            len(self.dictionary) * _WIDTH)
+
+    def _Open(self, path, size):
+        # the data written after the last Flush is dropped
+        f = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        f.truncate(size)
+        f.seek(size)
+        return f
+
+    def _LoadStrings(self):
+        self._strings_size = 0
+        if not self.meta['strings']:
+            return
+        reader = ColumnarReader(self.path, self.meta)
+        try:
+            for code in range(self.meta['strings']):
+                self.dictionary.Encode(reader.String(code))
+            self._strings_size = reader.StringsSize()
+        finally:
+            reader.Close()
+
+    def _AddField(self, name, value):
+        self.meta['fields'].append(name)
+        self.meta['types'][name] = _GetType(value)
+        f = self._Open(_ColumnPath(self.path, name), 0)
+        # the rows written before the field have no value
+        null = _NAN if self.meta['types'][name] == NUMBER else _NULL_CODE
+        for start in range(0, self.meta['rows'], 1024):
+            count = min(1024, self.meta['rows'] - start)
+            f.write(_Pack(self.meta['types'][name], [null] * count))
+        self._columns[name] = f
+
+    def _Encode(self, value):
+        if not isinstance(value, string_types):
+            value = dumps(value)
+        size = len(self.dictionary)
+        code = self.dictionary.Encode(value)
+        if code == size:
+            if not isinstance(value, text_type):
+                value = value.decode('utf-8')
+            value = value.encode('utf-8')
+            self._strings.write(value)
+            self._strings_size += len(value)
+            self._offsets.write(_Pack('q', [self._strings_size]))
+        return code
+
+    def Write(self, id, rows, date=''):
+        """
+        Appends the rows of the counter, the date of a block is the 'date'
+        field of its rows or date.
+        """
+        rows = list(rows)
+        for row in rows:
+            for name, value in row.items():
+                if (name not in self.meta['types']) and (value is not None):
+                    self._AddField(name, value)
+
+        blocks = self.meta['blocks']
+        start = self.meta['rows']
+        for i, row in enumerate(rows):
+            key = [id, row.get('date', date)]
+            if blocks and (blocks[-1][:2] == key) and (blocks[-1][3] == start + i):
+                blocks[-1][3] += 1
+            else:
+                blocks.append(key + [start + i, start + i + 1])
+
+        for name in self.meta['fields']:
+            type = self.meta['types'][name]
+            values = []
+            for row in rows:
+                value = row.get(name)
+                if type == NUMBER:
+                    values.append(_NAN if value is None else float(value))
+                else:
+                    values.append(_NULL_CODE if value is None else
+                        self._Encode(value))
+            self._columns[name].write(_Pack(type, values))
+        self.meta['rows'] += len(rows)
+        self.meta['strings'] = len(self.dictionary)
+        return len(rows)
+
+    def Fetch(self, method, id, date1='', date2='', **kwargs):
+        """
+        Requests all pages of the report with the Metrika.GetStat* method
+        and writes them page by page.
+        """
+        count = 0
+        rows = []
+        for row in IterRows(method, id, date1=date1, date2=date2, **kwargs):
+            rows.append(row)
+            if len(rows) >= 10000:
+                count += self.Write(id, rows, date1)
+                rows = []
+        count += self.Write(id, rows, date1)
+        self.Flush()
+        return count
+
+    def Flush(self):
+        """
+        Writes the columns and then replaces the meta, the rows are visible
+        to the readers after it.
+        """
+        for f in list(self._columns.values()) + [self._strings, self._offsets]:
+            f.flush()
+            os.fsync(f.fileno())
+        meta = os.path.join(self.path, 'meta.json')
+        with open(meta + '.tmp', 'wb') as f:
+            f.write(dumps(self.meta).encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        replace(meta + '.tmp', meta)
+
+    def Close(self):
+        self.Flush()
+        for f in list(self._columns.values()) + [self._strings, self._offsets]:
+            f.close()
+
+
+class ColumnarReader(object):
+    """
+    Reads the columnar table through mmap: nothing is parsed or loaded
+    when the table is opened, the columns are read only for the requested
+    rows and the strings are decoded on access.
+
+    reader = ColumnarReader('phrases')
+    visits = reader.Column('visits', id=id, date1='20120101', date2='20120107')
+    """
+    def __init__(self, path, meta=None):
+        self.path = path
+        if meta is None:
+            with open(os.path.join(path, 'meta.json'), 'rb') as f:
+                meta = loads(f.read())
+        self.meta = meta
+        self.fields = meta['fields']
+        self.rows = meta['rows']
+        self._maps = {}
+
+    def _Map(self, name, size):
+        m = self._maps.get(name)
+        if m is None:
+            if not size:
+                return b''
+            with open(os.path.join(self.path, name), 'rb') as f:
+                m = self._maps[name] = mmap.mmap(f.fileno(), size,
+                    access=mmap.ACCESS_READ)
+        return m
+
+    def StringsSize(self):
+        count = self.meta['strings']
+        if not count:
+            return 0
+        return struct.unpack_from('<q', self._Map('strings.idx',
+            count * _WIDTH), (count - 1) * _WIDTH)[0]
+
+    def String(self, code):
+        if code == _NULL_CODE:
+            return None
+        offsets = self._Map('strings.idx', self.meta['strings'] * _WIDTH)
+        start = struct.unpack_from('<q', offsets, (code - 1) * _WIDTH)[0] \
+            if code else 0
+        end = struct.unpack_from('<q', offsets, code * _WIDTH)[0]
+        return self._Map('strings.dat', self.StringsSize())[start:end].decode('utf-8')
+
+    def Blocks(self, id=None, date1=None, date2=None):
+        """
+        Returns the ranges (start, end) of the rows of the counter and
+        the dates 'YYYYMMDD'.
+        """
+        result = []
+        for block_id, date, start, end in self.meta['blocks']:
+            if (id is not None) and (block_id != id):
+                continue
+            if (date1 and date < date1) or (date2 and date > date2):
+                continue
+            if result and (result[-1][1] == start):
+                result[-1] = (result[-1][0], end)
+            else:
+                result.append((start, end))
+        return result
+
+    def _Read(self, name, start, end):
+        type = self.meta['types'][name]
+        m = self._Map('%s.col' % name, self.rows * _WIDTH)
+        return struct.unpack_from('<%d%s' % (end - start, type), m,
+            start * _WIDTH)
+
+    def Column(self, name, id=None, date1=None, date2=None, decode=True):
+        """
+        Returns the values of the field for the rows of the counter and
+        the dates. With decode=False the strings are returned as the codes.
+        """
+        values = []
+        for start, end in self.Blocks(id, date1, date2):
+            values.extend(self._Read(name, start, end))
+        if decode and (self.meta['types'][name] == STRING):
+            strings = {}
+            for i, code in enumerate(values):
+                value = strings.get(code)
+                if value is None:
+                    value = strings[code] = self.String(code)
+                values[i] = value
+        return values
+
+    def Rows(self, id=None, date1=None, date2=None, fields=None):
+        """
+        Yields the rows of the counter and the dates as dicts.
+        """
+        fields = fields or self.fields
+        for start, end in self.Blocks(id, date1, date2):
+            columns = [self._Read(name, start, end) for name in fields]
+            types = [self.meta['types'][name] for name in fields]
+            for values in zip(*columns):
+                row = {}
+                for name, type, value in zip(fields, types, values):
+                    if type == STRING:
+                        value = self.String(value)
+                    elif value != value:
+                        value = None
+                    if value is not None:
+                        row[name] = value
+                yield row
+
+    def Close(self):
+        for m in self._maps.values():
+            m.close()
+        self._maps = {}
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        compare
+# Purpose:     Comparison of a report for two periods
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+import datetime
+from array import array
+
+from .bundle import ParseDate, IsNumber, DATE_FORMAT
+from .compat import string_types
+from .paging import IterRows
+
+
+NAN = float('nan')
+
+
+def GetPreviousPeriod(date1, date2):
+    """
+    Returns the period of the same length right before date1..date2.
+    """
+    date1 = ParseDate(date1)
+    date2 = ParseDate(date2)
+    days = (date2 - date1).days + 1
+    last = date1 - datetime.timedelta(days=1)
+    first = last - datetime.timedelta(days=days - 1)
+    return first.strftime(DATE_FORMAT), last.strftime(DATE_FORMAT)
+
+
+class Comparison(object):
+    """
+    Metrics of the rows of two periods joined on the dimension key.
+    The columns are arrays of doubles in the order of keys, a row which is
+    absent in a period has 0 in its columns and False in its presence list.
+    """
+    def __init__(self, key, metrics, current, previous):
+        self.key = tuple(key)
+        self.metrics = list(metrics)
+        self.keys = []
+        index = {}
+        for rows in (current, previous):
+            for row in rows:
+                k = tuple([row.get(name) for name in self.key])
+                if k not in index:
+                    index[k] = len(self.keys)
+                    self.keys.append(k)
+        self.in_current, self.current = self._Columns(current, index)
+        self.in_previous, self.previous = self._Columns(previous, index)
+
+    def _Columns(self, rows, index):
+        present = [False] * len(self.keys)
+        columns = dict([(metric, array('d', [0.0]) * len(self.keys))
+            for metric in self.metrics])
+        for row in rows:
+            i = index[tuple([row.get(name) for name in self.key])]
+            present[i] = True
+            for metric in self.metrics:
+                value = row.get(metric)
+                if value is not None:
+                    columns[metric][i] = value
+        return present, columns
+
+    def Delta(self, metric):
+        """
+        Absolute change of the metric for every key.
+        """
+        return array('d', map(float.__sub__, self.current[metric],
+            self.previous[metric]))
+
+    def RelativeDelta(self, metric):
+        """
+        Relative change of the metric, NaN where the previous value is 0.
+        """
+        return array('d', [(c - p) / p if p else NAN
+            for c, p in zip(self.current[metric], self.previous[metric])])
+
+    def OnlyCurrent(self):
+        return [k for k, c, p in zip(self.keys, self.in_current, self.in_previous)
+            if c and not p]
+
+    def OnlyPrevious(self):
+        return [k for k, c, p in zip(self.keys, self.in_current, self.in_previous)
+            if p and not c]
+
+    def Rows(self):
+        """
+        Yields (key, {metric: (current, previous, delta)}).
+        """
+        for i, k in enumerate(self.keys):
+            values = {}
+            for metric in self.metrics:
+                c = self.current[metric][i]
+                p = self.previous[metric][i]
+                values[metric] = (c, p, c - p)
+            yield k, values
+
+
+def ComparePeriods(method, id, date1, date2, key=None, metrics=None,
+    previous=None, **kwargs):
+    """
+    Requests the report for date1..date2 and for the previous period of
+    the same length (or previous=(date1, date2)) in parallel and joins them
+    on the key fields.
+
+    key - fields of the dimension, by default the string fields of the rows.
+    metrics - fields to compare, by default the numeric fields.
+
+    cmp = ComparePeriods(metrika.GetStatSourcesPhrases, id, '20120201',
+        '20120229', key=('phrase',), metrics=('visits',))
+    """
+    if previous is None:
+        previous = GetPreviousPeriod(date1, date2)
+    metrika = method.__self__
+
+    def fetch(period):
+        return list(IterRows(method, id, date1=period[0], date2=period[1],
+            **kwargs))
+    current_rows, previous_rows = metrika._Map(fetch, [(date1, date2), previous])
+
+    sample = (current_rows or previous_rows or [{}])[0]
+    if key is None:
+        key = sorted([name for name, value in sample.items()
+            if isinstance(value, string_types)])
+    if metrics is None:
+        metrics = sorted([name for name, value in sample.items()
+            if IsNumber(value) and name not in key])
+    return Comparison(key, metrics, current_rows, previous_rows)
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        compat
+# Purpose:     Names which differ in Python 2 and Python 3
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+import sys
+
+PY2 = sys.version_info[0] == 2
+
+if PY2:
+    import httplib
+    # doesn't replace the existing file on Windows
+    from os import rename as replace
+    import Queue as queue
+    from urllib import urlencode
+    from urlparse import urlparse, urlsplit, parse_qsl
+
+    string_types = (str, unicode)
+    text_type = unicode
+    integer_types = (int, long)
+else:
+    import http.client as httplib
+    import queue
+    from os import replace
+    from urllib.parse import urlencode, urlparse, urlsplit, parse_qsl
+
+    string_types = (str,)
+    text_type = str
+    integer_types = (int,)
@@ -12,8 +12,11 @@
 # Licence:     MIT
 #-------------------------
 
-from simplejson import loads, dumps
+from simplejson import loads, dumps as _dumps
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
 import datetime
+import threading
 
 
 def _json_format(obj):
@@ -21,10 +24,15 @@ def _json_format(obj):
       return obj.isoformat()
   return None
 
-dumps = lambda data: dumps(data, use_decimal=True, default=_json_format)
+dumps = lambda data: _dumps(data, use_decimal=True, default=_json_format)
 
 
-from client import APIClient
+from .client import APIClient, Deadline, Cancelled, DeadlineExceeded, \
+    DeadlineTimeout
+from .compat import PY2
+from .query import StatQuery, MergeResults
+from .flight import SingleFlight, RequestKey
+from .breaker import GetBreakerKey
 
 
 class BaseClass(object):
@@ -55,13 +63,19 @@ class MethodNotAllowedError(ClientError):
   pass
 
 
+class TooManyRequestsError(ClientError):
+  """ 429 http-status """
+  pass
+
+
 class APIException(Exception):
   def __init__(self, msg, code=None):
       self.message = msg
       self.code = code
 
   def __repr__(self):
-      return '<APIException: %s, code %s>' % (self.message.encode('utf-8'), self.code)
+      message = self.message.encode('utf-8') if PY2 else self.message
+      return '<APIException: %s, code %s>' % (message, self.code)
 
   __str__ = __repr__
 
@@ -79,6 +93,28 @@ class JSON2Obj(object):
 class BaseMetrika(object):
   OAUTH_TOKEN = 'https://oauth.yandex.ru/token'
   _UserAgent = 'yametrikapy'
+  # Size of the thread pool for the parallel requests
+  Threads = 8
+  # Identical concurrent GET requests are made once, every caller gets its
+  # own object decoded from the shared response
+  Coalesce = True
+  _flights = SingleFlight()
+  # ResponseCache for the conditional GET requests, None - switched off
+  Cache = None
+  # seconds, None - wait forever
+  ConnectTimeout = None
+  ReadTimeout = None
+  # decoding.DecoderPool for the large responses, None - decode in the thread
+  Decoder = None
+  # scheduler.Scheduler which shares the requests between the priority
+  # classes, None - every request goes at once
+  Scheduler = None
+  # breaker.Breakers which fail fast the requests to the failing endpoints
+  Breakers = None
+  # client.HedgePolicy for GET requests, None - no hedged requests
+  Hedging = None
+  # GET requests of a thread reuse its connection to the host
+  KeepAlive = False
 
   def __init__(self, client_id, username='', password='', token='', code=''):
       self._ClientId = client_id
@@ -87,8 +123,9 @@ class BaseMetrika(object):
       self._Token = token
       self._Code = code
 
-      self._client = APIClient()
-      self._client.UserAgent = self._UserAgent
+      # the client and the last response are kept per thread, so one instance
+      # can be used from the thread pool
+      self._local = threading.local()
       self._data = ''
 
   @property
@@ -99,12 +136,136 @@ class BaseMetrika(object):
   def UserAgent(self, user_agent):
       self._UserAgent = user_agent
 
+  @property
+  def _client(self):
+      client = getattr(self._local, 'client', None)
+      if client is None:
+          client = self._local.client = APIClient()
+          client.UserAgent = self._UserAgent
+      return client
+
+  @property
+  def _data(self):
+      return getattr(self._local, 'data', '')
+
+  @_data.setter
+  def _data(self, data):
+      self._local.data = data
+
+  @property
+  def _deadline(self):
+      return getattr(self._local, 'deadline', None)
+
+  @_deadline.setter
+  def _deadline(self, deadline):
+      self._local.deadline = deadline
+
+  @property
+  def _priority(self):
+      return getattr(self._local, 'priority', None)
+
+  @_priority.setter
+  def _priority(self, priority):
+      self._local.priority = priority
+
+  @contextmanager
+  def WithDeadline(self, timeout=None, deadline=None):
+      """
+      Limits the time of all requests made in the block, including the pages
+      and the parallel requests. deadline.cancel() from another thread stops
+      the call before the next request. Iterators must be consumed inside
+      the block.
+
+      with metrika.WithDeadline(60) as deadline:
+          counters = metrika.GetCounterList()
+      """
+      if deadline is None:
+          deadline = Deadline(timeout)
+      previous = self._deadline
+      self._deadline = deadline
+      try:
+          yield deadline
+      finally:
+          self._deadline = previous
+
+  @contextmanager
+  def WithPriority(self, priority, tenant=None, weight=1):
+      """
+      Sets the priority class of the Scheduler for all requests made in
+      the block. The tenant shares the slots of the class by its weight,
+      by default the tenant is the counter of the request.
+
+      with metrika.WithPriority('interactive'):
+          metrika.GetStatTrafficSummary(id)
+      """
+      previous = self._priority
+      self._priority = (priority, tenant, weight)
+      try:
+          yield
+      finally:
+          self._priority = previous
+
+  def _Bind(self, f):
+      """
+      Passes the deadline and the priority of the current thread to
+      the threads of the pool.
+      """
+      deadline = self._deadline
+      priority = self._priority
+      def wrapper(item):
+          self._deadline = deadline
+          self._priority = priority
+          if deadline is not None:
+              deadline.check()
+          return f(item)
+      return wrapper
+
+  def _Map(self, f, items, threads=None):
+      """
+      Calls f for each item in the pool of threads (Threads by default) and
+      returns the list of results in the order of items.
+      """
+      items = list(items)
+      f = self._Bind(f)
+      threads = self.Threads if threads is None else threads
+      if len(items) < 2 or threads < 2:
+          return [f(item) for item in items]
+      pool = ThreadPool(min(threads, len(items)))
+      try:
+          return pool.map(f, items)
+      finally:
+          pool.terminate()
+
+  def _IMap(self, f, items, threads=None):
+      """
+      Like _Map, but yields the results in the order of items as soon as
+      they are ready.
+      """
+      items = list(items)
+      f = self._Bind(f)
+      threads = self.Threads if threads is None else threads
+      if len(items) < 2 or threads < 2:
+          for item in items:
+              yield f(item)
+          return
+      pool = ThreadPool(min(threads, len(items)))
+      try:
+          for result in pool.imap(f, items):
+              yield result
+      finally:
+          pool.terminate()
+
+  def _Loads(self, page):
+      if self.Decoder is not None:
+          return self.Decoder.Loads(page)
+      return loads(page)
+
   def _GetResponseObject(f):
       """
       """
       def wrapper(self):
           # lets make dict from json
-          obj = loads(self._data)
+          obj = self._Loads(self._data)
           if 'errors' in obj:
               if len(obj['errors']) == 1:
                   if isinstance(self, MetrikaV1):
@@ -160,7 +321,53 @@ class BaseMetrika(object):
 
   @_Auth
   def _GetData(self, method, uri, params={}):
+      if method != 'GET' or not self.Coalesce:
+          return self._Send(method, uri, params)[0]
+      key = (self.__class__,) + RequestKey(method, uri, params, self._Token)
+      obj, self._data = self._flights.Do(key,
+          lambda: self._Send(method, uri, params), self._deadline, self._Copy)
+      return obj
+
+  def _Copy(self, result):
+      # every waiter of the coalesced request decodes its own object from
+      # the shared body, so the callers can change their results
+      self._data = result[1]
+      return self._ResponseHandle(), result[1]
+
+  def _Send(self, method, uri, params={}):
+      if self.Breakers is None:
+          return self._Schedule(method, uri, params)
+      return self.Breakers.Call(GetBreakerKey(uri),
+          lambda: self._Schedule(method, uri, params), self._IsFailure)
+
+  def _IsFailure(self, e):
+      # the endpoint didn't answer in the rest of the deadline
+      if isinstance(e, DeadlineTimeout):
+          return True
+      # the caller stopped the call before the request was sent, it's not
+      # counted
+      if isinstance(e, (Cancelled, DeadlineExceeded)):
+          return None
+      # errors of the request itself say nothing about the endpoint
+      return not isinstance(e, ClientError)
+
+  def _Schedule(self, method, uri, params={}):
+      if self.Scheduler is None:
+          return self._Request(method, uri, params)
+      priority, tenant, weight = self._priority or ('batch', None, 1)
+      if (tenant is None) and isinstance(params, dict):
+          tenant = params.get('id')
+      return self.Scheduler.Run(lambda: self._Request(method, uri, params),
+          priority, tenant, weight, self._deadline)
+
+  def _Request(self, method, uri, params={}):
       headers = self._GetHeaders()
+      self._client.cache = self.Cache
+      self._client.connect_timeout = self.ConnectTimeout
+      self._client.read_timeout = self.ReadTimeout
+      self._client.deadline = self._deadline
+      self._client.hedging = self.Hedging
+      self._client.keep_alive = self.KeepAlive
       self._data = self._client.request(method, uri, params=params, headers=headers)
       if self._client.Status == 400:
           raise BadRequestError('%d %s' % (self._client.Status, 'Check your request'))
@@ -171,7 +378,11 @@ class BaseMetrika(object):
       if self._client.Status == 405:
           allowed = self._client.GetHeader('Allowed')
           raise MethodNotAllowedError('%d: %s\nUse %s' % (self._client.Status, 'Method not allowed', allowed))
-      return self._ResponseHandle()
+      if self._client.Status == 429:
+          raise TooManyRequestsError('%d: %s' % (self._client.Status, 'Request limit is exceeded'))
+      # on 304 the cached body is decoded again, so the callers can't change
+      # the cached response
+      return self._ResponseHandle(), self._data
 
   _GetResponseObject = staticmethod(_GetResponseObject)
 
@@ -188,15 +399,67 @@ class MetrikaV1(BaseMetrika):
   def getDS(self, **params):
       return self._GetData('GET', self.HOST + '/stat/v1/data', params)
 
+  def GetStatData(self, query):
+      """
+      https://tech.yandex.ru/metrika/doc/api2/api_v1/data-docpage/
+
+      query - StatQuery. The query with too many metrics is split on several
+      requests, all pages of the report are requested in parallel after
+      the first one and the result is merged like one response of the API.
+      """
+      uri = self.HOST + '/stat/v1/data'
+      queries = query.Split()
+
+      def first_page(q):
+          limit = min(q.page_size, q.limit) if q.limit else q.page_size
+          return self._GetData('GET', uri, q.GetParams(1, limit))
+      # the responses may be shared with other callers, they are not changed
+      results = [dict(page, data=list(page['data']))
+          for page in self._Map(first_page, queries)]
+
+      pages = []
+      for i, q in enumerate(queries):
+          for offset, limit in q.GetOffsets(results[i]['total_rows']):
+              pages.append((i, q.GetParams(offset, limit)))
+      data = self._Map(lambda page: self._GetData('GET', uri, page[1])['data'], pages)
+      for (i, params), rows in zip(pages, data):
+          results[i]['data'].extend(rows)
+
+      return MergeResults(results)
+
   def GetCounterList(self, **params):
       """
       https://tech.yandex.ru/metrika/doc/beta/management/counters/counters-docpage/
+
+      Returns all counters, the pages after the first one are requested
+      in parallel.
       """
-      data = self._GetData('GET', self.HOST + '/management/v1/counters', params)
-      if data['rows'] > 0:
-          return data['counters']
+      return list(self.IterCounterList(**params))
 
-      return []
+  def IterCounterList(self, **params):
+      """
+      Yields all counters in the order of the API. The number of counters is
+      taken from the first page, the rest pages are requested in parallel.
+      """
+      uri = self.HOST + '/management/v1/counters'
+      data = self._GetData('GET', uri, params)
+      if data['rows'] <= 0:
+          return
+      for counter in data['counters']:
+          yield counter
+
+      per_page = len(data['counters'])
+      if not per_page:
+          return
+      start = int(params.get('offset', 1))
+
+      def get_page(offset):
+          page_params = dict(params, offset=offset, per_page=per_page)
+          return self._GetData('GET', uri, page_params)['counters']
+      offsets = range(start + per_page, data['rows'] + 1, per_page)
+      for counters in self._IMap(get_page, offsets):
+          for counter in counters:
+              yield counter
 
   def GetCounter(self, counter_id, field=''):
       """
@@ -609,6 +872,40 @@ class Metrika(BaseMetrika):
       uri = self._GetURI(self._DELEGATE % user_login)
       return self._GetData('DELETE', uri)
 
+  def SyncDelegates(self, user_logins):
+      """
+      Makes the list of delegates equal to user_logins by one request of
+      the whole list, the kept delegates keep their comments. If the list
+      is rejected, the changes are made by AddDelegate and DeleteDelegate.
+      Returns the object with the lists of added and removed logins.
+      """
+      current = self.GetDelegates().delegates
+      logins = dict([(login.lower(), login) for login in user_logins])
+      result = BaseClass()
+      result.removed = [delegate['user_login'] for delegate in current
+          if delegate['user_login'].lower() not in logins]
+      for delegate in current:
+          logins.pop(delegate['user_login'].lower(), None)
+      result.added = sorted(logins.values())
+      if not (result.added or result.removed):
+          return result
+
+      delegates = [self._DelegateFields(delegate) for delegate in current
+          if delegate['user_login'] not in result.removed]
+      delegates.extend([{'user_login': login} for login in result.added])
+      try:
+          self.EditDelegates(delegates)
+      except (BadRequestError, APIException):
+          for login in result.removed:
+              self.DeleteDelegate(login)
+          for login in result.added:
+              self.AddDelegate(login)
+      return result
+
+  def _DelegateFields(self, delegate):
+      return dict([(name, value) for name, value in delegate.items()
+          if name in ('user_login', 'comment')])
+
   # Accounts
 
   def GetAccounts(self):
@@ -644,6 +941,34 @@ class Metrika(BaseMetrika):
       uri = self._GetURI(self._ACCOUNT % user_login)
       return self._GetData('DELETE', uri)
 
+  def SyncAccounts(self, user_logins):
+      """
+      Leaves in the list of accounts only user_logins by one request of
+      the whole list. The accounts can't be added this way, the logins which
+      are not in the list are returned as missing. If the list is rejected,
+      the accounts are removed by DeleteAccount.
+      Returns the object with the lists of removed and missing logins.
+      """
+      current = self.GetAccounts().accounts
+      logins = dict([(login.lower(), login) for login in user_logins])
+      result = BaseClass()
+      result.removed = [account['user_login'] for account in current
+          if account['user_login'].lower() not in logins]
+      for account in current:
+          logins.pop(account['user_login'].lower(), None)
+      result.missing = sorted(logins.values())
+      if not result.removed:
+          return result
+
+      accounts = [{'user_login': account['user_login']} for account in current
+          if account['user_login'] not in result.removed]
+      try:
+          self.EditAccounts(accounts)
+      except (BadRequestError, APIException):
+          for login in result.removed:
+              self.DeleteAccount(login)
+      return result
+
   # Statistics
 
   def GetStatTrafficSummary(self, id, goal_id=None, date1='', date2='',
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        decoding
+# Purpose:     Decoding of large responses in a pool of processes
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+import multiprocessing
+
+from simplejson import loads
+
+
+class _Rows(object):
+    """
+    List of the dicts with the same keys packed as the fields and the tuples
+    of values, it's much smaller to pickle than the dicts.
+    """
+    __slots__ = ('fields', 'values')
+
+    def __init__(self, fields, values):
+        self.fields = fields
+        self.values = values
+
+    def __getstate__(self):
+        return (self.fields, self.values)
+
+    def __setstate__(self, state):
+        self.fields, self.values = state
+
+    def Unpack(self):
+        fields = self.fields
+        return [dict(zip(fields, values)) for values in self.values]
+
+
+def _Pack(obj):
+    if not isinstance(obj, dict):
+        return obj
+    packed = {}
+    for name, value in obj.items():
+        if isinstance(value, list) and value and isinstance(value[0], dict):
+            fields = tuple(value[0])
+            keys = set(fields)
+            if all([isinstance(row, dict) and (len(row) == len(fields)) and
+                keys.issuperset(row) for row in value]):
+                value = _Rows(fields, [tuple([row[f] for f in fields])
+                    for row in value])
+        packed[name] = value
+    return packed
+
+
+def _Decode(page):
+    return _Pack(loads(page))
+
+
+def _Unpack(obj):
+    if not isinstance(obj, dict):
+        return obj
+    return dict([(name, value.Unpack() if isinstance(value, _Rows) else value)
+        for name, value in obj.items()])
+
+
+class DecoderPool(object):
+    """
+    Decodes JSON of the responses larger than threshold bytes in a pool of
+    processes, so the parsing of parallel exports is not limited by one core.
+    The smaller responses are decoded in the calling thread.
+
+    metrika.Decoder = DecoderPool()
+    """
+    THRESHOLD = 256 * 1024
+
+    def __init__(self, processes=None, threshold=THRESHOLD):
+        self.threshold = threshold
+        self._pool = multiprocessing.Pool(processes)
+
+    def Loads(self, page):
+        if len(page) < self.threshold:
+            return loads(page)
+        return _Unpack(self._pool.apply(_Decode, (page,)))
+
+    def Close(self):
+        self._pool.close()
+        self._pool.join()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        encoding
+# Purpose:     Dictionary encoding of the dimension strings of reports
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+import threading
+
+from .compat import string_types
+from .paging import IterRows
+
+
+class Dictionary(object):
+    """
+    Maps the strings (urls, phrases, titles) on integer codes. One dictionary
+    is shared by the pages, reports and counters of an export session, so
+    every distinct string is kept once.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._codes = {}
+        self._values = []
+
+    def Encode(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    code = len(self._values)
+                    self._values.append(value)
+                    self._codes[value] = code
+        return code
+
+    def Decode(self, code):
+        return self._values[code]
+
+    def __len__(self):
+        return len(self._values)
+
+
+class EncodedRows(object):
+    """
+    Rows of a report stored as tuples in the order of fields. The string
+    fields (found by the first row, or given as dimensions) are stored as
+    codes of the dictionary and decoded on demand.
+    """
+    def __init__(self, dictionary=None, fields=None, dimensions=None):
+        self.dictionary = dictionary if dictionary is not None else Dictionary()
+        self.fields = list(fields) if fields else None
+        self.dimensions = set(dimensions) if dimensions else None
+        self._encoded = None
+        self._rows = []
+
+    def _Init(self, row):
+        if self.fields is None:
+            self.fields = sorted(row.keys())
+        if self.dimensions is None:
+            self.dimensions = set([name for name in self.fields
+                if isinstance(row.get(name), string_types)])
+        self._encoded = [name in self.dimensions for name in self.fields]
+
+    def Add(self, row):
+        if self._encoded is None:
+            self._Init(row)
+        encode = self.dictionary.Encode
+        values = []
+        for name, encoded in zip(self.fields, self._encoded):
+            value = row.get(name)
+            if encoded and (value is not None):
+                value = encode(value)
+            values.append(value)
+        self._rows.append(tuple(values))
+
+    def Extend(self, rows):
+        for row in rows:
+            self.Add(row)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def Codes(self, i):
+        """
+        Returns the encoded tuple of the row.
+        """
+        return self._rows[i]
+
+    def Row(self, i):
+        """
+        Returns the decoded row as dict.
+        """
+        decode = self.dictionary.Decode
+        row = {}
+        for name, encoded, value in zip(self.fields, self._encoded, self._rows[i]):
+            if encoded and (value is not None):
+                value = decode(value)
+            row[name] = value
+        return row
+
+    def Column(self, name, decode=True):
+        i = self.fields.index(name)
+        values = [row[i] for row in self._rows]
+        if decode and self._encoded[i]:
+            values = [None if v is None else self.dictionary.Decode(v)
+                for v in values]
+        return values
+
+    def __iter__(self):
+        for i in range(len(self._rows)):
+            yield self.Row(i)
+
+
+def FetchEncoded(method, *args, **kwargs):
+    """
+    Reads all pages of the report into EncodedRows. Pass the same
+    dictionary=Dictionary() for all reports of the export.
+
+    rows = FetchEncoded(metrika.GetStatContentPopular, id, dictionary=d,
+        date1='20120101', date2='20120131')
+    """
+    rows = EncodedRows(kwargs.pop('dictionary', None),
+        dimensions=kwargs.pop('dimensions', None))
+    rows.Extend(IterRows(method, *args, **kwargs))
+    return rows
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        flight
+# Purpose:     Coalescing of the identical concurrent requests
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+import threading
+
+from .client import Cancelled, DeadlineExceeded
+from .compat import urlsplit, parse_qsl
+
+
+def RequestKey(method, uri, params, token):
+    """
+    Returns the key of the request which doesn't depend on the order of
+    the parameters and on whether they are in the URI or in params.
+    """
+    parts = urlsplit(uri)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if isinstance(params, dict):
+        query.extend(params.items())
+    elif params:
+        query.extend(parse_qsl(params, keep_blank_values=True))
+    query = tuple(sorted([(name, '%s' % value) for name, value in query]))
+    return (method, parts.scheme, parts.netloc.lower(), parts.path, query, token)
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Runs only one call for the key at a time, the concurrent callers with
+    the same key wait for it and get its result or the same exception.
+    The waiters get copy(result) when copy is given, otherwise the result
+    itself, which then must not be changed by the callers.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def Do(self, key, f, deadline=None, copy=None):
+        """
+        deadline - client.Deadline of the caller, it's checked while
+        the caller waits for the call of another thread. When the call is
+        cancelled or exceeds the deadline of its caller, the waiters don't
+        get that error, one of them makes the call again.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+            if leader:
+                break
+
+            if deadline is None:
+                call.done.wait()
+            else:
+                deadline.wait(call.done)
+            if isinstance(call.error, (Cancelled, DeadlineExceeded)):
+                continue
+            if call.error is not None:
+                raise call.error
+            if copy is not None:
+                return copy(call.result)
+            return call.result
+
+        try:
+            call.result = f()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def InFlight(self):
+        """
+        Number of the calls in progress.
+        """
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        goals
+# Purpose:     Conversion matrix of the goals of counters
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+from array import array
+
+from .paging import IterRows
+
+
+NAN = float('nan')
+
+
+class GoalMatrix(object):
+    """
+    Values of the metrics by counter x goal x key (date, source, region)
+    in one flat array of doubles. The goals belong to their counters, so
+    only the (counter, goal) pairs of pairs have their blocks of
+    keys x metrics values in the array. Missing values are NaN, Get of
+    a pair without the block returns NaN.
+    """
+    def __init__(self, pairs, keys, metrics):
+        self.pairs = list(pairs)
+        self.keys = list(keys)
+        self.metrics = list(metrics)
+        self._blocks = dict([(pair, i) for i, pair in enumerate(self.pairs)])
+        self._keys = dict([(v, i) for i, v in enumerate(self.keys)])
+        self._metrics = dict([(v, i) for i, v in enumerate(self.metrics)])
+        self._block_size = len(self.keys) * len(self.metrics)
+        self.values = array('d', [NAN]) * (len(self.pairs) * self._block_size)
+
+    @property
+    def counters(self):
+        return sorted(set([counter for counter, goal in self.pairs]))
+
+    def Goals(self, counter):
+        return [goal for c, goal in self.pairs if c == counter]
+
+    def _Index(self, counter, goal, key, metric):
+        i = self._blocks[(counter, goal)] * self._block_size
+        return i + self._keys[key] * len(self.metrics) + self._metrics[metric]
+
+    def Get(self, counter, goal, key, metric):
+        if (counter, goal) not in self._blocks:
+            return NAN
+        return self.values[self._Index(counter, goal, key, metric)]
+
+    def Set(self, counter, goal, key, metric, value):
+        self.values[self._Index(counter, goal, key, metric)] = value
+
+    def Series(self, counter, goal, metric):
+        """
+        Returns the values of the metric for all keys.
+        """
+        return [self.Get(counter, goal, key, metric) for key in self.keys]
+
+
+def GetGoalMatrix(metrika, ids, report='GetStatTrafficSummary', key='date',
+    metrics=('visits',), **kwargs):
+    """
+    Discovers the goals of the counters and requests the report for every
+    counter and goal in the thread pool of metrika, then puts the rows
+    into GoalMatrix. The rows without the key field are skipped.
+
+    report - name of the Metrika.GetStat* method with goal_id, like
+        GetStatTrafficSummary, GetStatSourcesSummary or GetStatGeo.
+    key - field of the rows for the third axis, like 'date' or 'name'.
+
+    matrix = GetGoalMatrix(metrika, ids, date1='20120101', date2='20120131')
+    """
+    ids = list(ids)
+    method = getattr(metrika, report)
+    goal_lists = metrika._Map(lambda id: metrika.GetCounterGoalList(id).goals, ids)
+
+    tasks = []
+    for id, goal_list in zip(ids, goal_lists):
+        for goal in goal_list:
+            tasks.append((id, goal['id']))
+
+    def get_rows(task):
+        return list(IterRows(method, task[0], goal_id=task[1], **kwargs))
+    results = metrika._Map(get_rows, tasks)
+
+    keys = set()
+    for rows in results:
+        keys.update([row.get(key) for row in rows])
+    keys.discard(None)
+
+    matrix = GoalMatrix(tasks, sorted(keys), metrics)
+    for (id, goal_id), rows in zip(tasks, results):
+        for row in rows:
+            if row.get(key) is None:
+                continue
+            for metric in metrics:
+                value = row.get(metric)
+                if value is not None:
+                    matrix.Set(id, goal_id, row.get(key), metric, value)
+    return matrix
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        inventory
+# Purpose:     Detection of the changes of counters by the hashes of content
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+import hashlib
+
+from simplejson import dumps
+
+
+SECTIONS = ('goals', 'filters', 'operations', 'grants')
+# the values of the parameter 'field' of the requests for the sections
+FIELDS = {'goals': 'goals', 'filters': 'filters', 'operations': 'operation',
+    'grants': 'grants'}
+# the hash of the fields of the counter itself
+COUNTER = 'counter'
+
+
+def GetHash(value):
+    """
+    Returns the hash of the value which doesn't depend on the order of
+    the keys of dicts.
+    """
+    data = dumps(value, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def GetCounterHashes(counter, sections=SECTIONS):
+    """
+    Returns {'counter': hash, 'goals': hash, ...} for the dict of counter,
+    the sections which are not in the dict are skipped.
+    """
+    hashes = {COUNTER: GetHash(dict([(name, value)
+        for name, value in counter.items() if name not in sections]))}
+    for name in sections:
+        if name in counter:
+            hashes[name] = GetHash(counter[name])
+    return hashes
+
+
+class Changes(object):
+    """
+    added, removed - the ids of counters, changed - {id: [sections]}. The ids
+    are strings, so the snapshots survive JSON.
+    """
+    def __init__(self, added=None, removed=None, changed=None):
+        self.added = added or []
+        self.removed = removed or []
+        self.changed = changed or {}
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return '<Changes: added %s, removed %s, changed %s>' % (
+            self.added, self.removed, self.changed)
+
+
+def GetField(sections):
+    """
+    Returns the parameter 'field' of the requests of the counters with
+    the sections.
+    """
+    return ','.join([FIELDS.get(name, name) for name in sections])
+
+
+def CompareSnapshots(previous, current):
+    """
+    Compares the snapshots {id: {section: hash}}.
+    """
+    changes = Changes()
+    for id in sorted(current):
+        if id not in previous:
+            changes.added.append(id)
+            continue
+        hashes = previous[id]
+        sections = sorted([name for name, value in current[id].items()
+            if hashes.get(name) != value])
+        if sections:
+            changes.changed[id] = sections
+    changes.removed = sorted([id for id in previous if id not in current])
+    return changes
+
+
+class Inventory(object):
+    """
+    Keeps the hashes of the counters and their goals, filters, operations
+    and grants of the previous poll. The list of counters is requested with
+    all sections, so one request finds the changes and already has
+    the changed counters in full: they are kept in counters by id until
+    the next poll. Fetch requests single counters again, e.g. for
+    the snapshots made from lists without the sections.
+
+    inventory = Inventory(metrika)
+    changes = inventory.Poll()
+    for id in changes.added + list(changes.changed):
+        counter = inventory.counters[id]
+        ...
+
+    The snapshot is a dict with JSON types, it can be saved between
+    the runs and passed to the constructor.
+    """
+    def __init__(self, metrika, snapshot=None, sections=SECTIONS):
+        self.metrika = metrika
+        self.sections = sections
+        self.snapshot = snapshot or {}
+        # id -> the counter of the last poll
+        self.counters = {}
+
+    def Snapshot(self, counters):
+        """
+        Returns the snapshot of the list of counters.
+        """
+        return dict([(str(counter['id']),
+            GetCounterHashes(counter, self.sections)) for counter in counters])
+
+    def Update(self, counters):
+        """
+        Replaces the snapshot by the one of counters and returns the changes.
+        """
+        current = self.Snapshot(counters)
+        changes = CompareSnapshots(self.snapshot, current)
+        self.snapshot = current
+        return changes
+
+    def Poll(self, **params):
+        """
+        Requests the list of counters with the sections and returns
+        the changes since the previous poll.
+        """
+        params['field'] = GetField(self.sections)
+        counters = self.metrika.GetCounterList(**params).counters
+        self.counters = dict([(str(counter['id']), counter)
+            for counter in counters])
+        return self.Update(counters)
+
+    def Fetch(self, ids):
+        """
+        Requests the counters with the sections in parallel.
+        """
+        field = GetField(self.sections)
+        return [obj.counter for obj in self.metrika._Map(
+            lambda id: self.metrika.GetCounter(int(id), field=field), ids)]
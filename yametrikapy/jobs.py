@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        jobs
+# Purpose:     Checkpointed export jobs which resume after a restart
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+import os
+import threading
+
+from simplejson import dumps, loads
+
+from .compat import replace
+from .paging import GetNext
+
+
+def GetUnitKey(report, id, kwargs):
+    """
+    Returns the key of the unit of the job: the report, the counter and
+    the parameters of the request.
+    """
+    return dumps([report, id, kwargs], sort_keys=True)
+
+
+class ExportJob(object):
+    """
+    Export of the reports of the counters into the file of JSON lines
+    {"report": ..., "id": ..., "row": {...}}. After every page the rows are
+    flushed to the output and the checkpoint (the completed units, the next
+    page of every started unit and the size of the output) is replaced
+    atomically. A restarted job truncates the output to the size of
+    the checkpoint, skips the completed units and continues the started ones
+    from their next pages, so no row is requested or written twice.
+
+    job = ExportJob(metrika, 'export.jsonl')
+    for id in ids:
+        job.Add('GetStatSourcesPhrases', id, date1='20120101', date2='20121231')
+    job.Run()
+    """
+    def __init__(self, metrika, path, checkpoint=None):
+        self.metrika = metrika
+        self.path = path
+        self.checkpoint = checkpoint or path + '.checkpoint'
+        self.units = []
+        self._lock = threading.Lock()
+        self._state = self._Load()
+
+    def _Load(self):
+        if not os.path.exists(self.checkpoint):
+            return {'done': [], 'next': {}, 'offset': 0}
+        with open(self.checkpoint, 'rb') as f:
+            return loads(f.read())
+
+    def _Save(self):
+        temp = self.checkpoint + '.tmp'
+        with open(temp, 'wb') as f:
+            f.write(dumps(self._state).encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        replace(temp, self.checkpoint)
+
+    def Add(self, report, id, **kwargs):
+        """
+        Adds the unit of the job: report is the name of the paginated
+        Metrika.GetStat* method.
+        """
+        key = GetUnitKey(report, id, kwargs)
+        if key not in [unit[0] for unit in self.units]:
+            self.units.append((key, report, id, kwargs))
+        return key
+
+    def Pending(self):
+        done = set(self._state['done'])
+        return [unit for unit in self.units if unit[0] not in done]
+
+    def Status(self):
+        """
+        Returns (number of completed units, number of units, bytes written).
+        """
+        done = set(self._state['done'])
+        return (len([unit for unit in self.units if unit[0] in done]),
+            len(self.units), self._state['offset'])
+
+    def Run(self, threads=1):
+        """
+        Exports the pending units, threads of them in parallel.
+        """
+        mode = 'r+b' if os.path.exists(self.path) else 'wb'
+        with open(self.path, mode) as output:
+            # drop the rows written after the last checkpoint
+            output.truncate(self._state['offset'])
+            output.seek(self._state['offset'])
+            units = self.Pending()
+            self.metrika._Map(lambda unit: self._Export(unit, output), units,
+                threads)
+
+    def _Export(self, unit, output):
+        key, report, id, kwargs = unit
+        method = getattr(self.metrika, report)
+        next = self._state['next'].get(key)
+        while True:
+            if next:
+                page = method(id, **dict(kwargs, next=next))
+            else:
+                page = method(id, **kwargs)
+            next = GetNext(page)
+            lines = ''.join([dumps({'report': report, 'id': id, 'row': row}) +
+                '\n' for row in page.data])
+            with self._lock:
+                output.write(lines.encode('utf-8'))
+                output.flush()
+                os.fsync(output.fileno())
+                self._state['offset'] = output.tell()
+                if next:
+                    self._state['next'][key] = next
+                else:
+                    self._state['next'].pop(key, None)
+                    self._state['done'].append(key)
+                self._Save()
+            if not next:
+                return
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        paging
+# Purpose:     Helpers for the paginated reports of Metrika
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+import heapq
+
+
+def GetNext(page):
+    """
+    Returns the link to the next page of the report or ''.
+    """
+    links = getattr(page, 'links', None) or {}
+    return links.get('next', '')
+
+
+def IterPages(method, *args, **kwargs):
+    """
+    Yields the pages of the report, the next page is requested only when
+    the previous one is consumed.
+
+    method - one of the paginated Metrika.GetStat* methods.
+    """
+    page = method(*args, **kwargs)
+    while True:
+        yield page
+        next = GetNext(page)
+        if not next:
+            return
+        kwargs['next'] = next
+        page = method(*args, **kwargs)
+
+
+def IterRows(method, *args, **kwargs):
+    """
+    Yields the rows of all pages of the report. With stop=predicate
+    the iteration ends on the first row for which predicate(row) is true,
+    no more pages are requested after it. stop_at=value is StopAt for
+    the sort and reverse of the request (by default of the GetStat* methods
+    'visits' and 1), so the direction always matches the request.
+
+    for row in IterRows(metrika.GetStatSourcesPhrases, id, stop_at=10):
+    """
+    stop = kwargs.pop('stop', None)
+    if 'stop_at' in kwargs:
+        stop = StopAt(kwargs.get('sort', 'visits'), kwargs.pop('stop_at'),
+            kwargs.get('reverse', 1))
+    for page in IterPages(method, *args, **kwargs):
+        for row in page.data:
+            if (stop is not None) and stop(row):
+                return
+            yield row
+
+
+def StopAt(field, value, reverse=1):
+    """
+    Stop predicate for the report sorted by field in the same order as
+    the request: with reverse=1 (descending) it stops on the first row below
+    value, with reverse=0 on the first row above value. Works for numbers
+    and for the dates of grouped reports as 'YYYYMMDD' strings. A row
+    without the field can't be ordered, it stops the iteration too.
+    """
+    def stop(row):
+        v = row.get(field)
+        if v is None:
+            return True
+        return (v < value) if reverse else (v > value)
+    return stop
+
+
+class _Stream(object):
+    """
+    Rows of the report of one counter, the pages are requested lazily.
+    """
+    def __init__(self, method, id, page, kwargs):
+        self.method = method
+        self.id = id
+        self.rows = page.data
+        self.index = 0
+        self.next = GetNext(page)
+        self.kwargs = kwargs
+
+    def Current(self):
+        if self.index >= len(self.rows) and self.next:
+            page = self.method(self.id, **dict(self.kwargs, next=self.next))
+            self.rows = page.data
+            self.index = 0
+            self.next = GetNext(page)
+        if self.index < len(self.rows):
+            return self.rows[self.index]
+        return None
+
+
+def TopRows(method, ids, n, sort='visits', reverse=1, **kwargs):
+    """
+    Returns the global top n rows of the report over the counters as
+    the list of (counter id, row) in the order of sort.
+
+    The rows of every counter are already sorted by the API, so the streams
+    are merged with the heap and a page is requested only when all rows of
+    the previous page of that counter get into the top. The first pages are
+    requested in parallel.
+
+    top = TopRows(metrika.GetStatSourcesPhrases, ids, 100, date1='20120101')
+    """
+    ids = list(ids)
+    kwargs['sort'] = sort
+    kwargs['reverse'] = reverse
+    sign = -1 if reverse else 1
+    metrika = method.__self__
+    pages = metrika._Map(lambda id: method(id, **kwargs), ids)
+
+    streams = [_Stream(method, id, page, kwargs) for id, page in zip(ids, pages)]
+    heap = []
+
+    def push(i):
+        row = streams[i].Current()
+        if row is not None:
+            heapq.heappush(heap, (sign * (row.get(sort) or 0), i))
+
+    for i in range(len(streams)):
+        push(i)
+
+    result = []
+    while heap and (len(result) < n):
+        value, i = heapq.heappop(heap)
+        stream = streams[i]
+        result.append((stream.id, stream.rows[stream.index]))
+        stream.index += 1
+        # the next row may need a new page, it's not requested for a full top
+        if len(result) < n:
+            push(i)
+    return result
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        poller
+# Purpose:     Adaptive polling of the load of counters in near real time
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+import datetime
+import heapq
+import threading
+import time
+
+from .bundle import DATE_FORMAT
+
+
+class _Target(object):
+    def __init__(self, id, interval):
+        self.id = id
+        self.interval = interval
+        self.date = None
+        # date -> the last row of the date
+        self.points = {}
+
+
+class LoadPoller(object):
+    """
+    Polls GetStatTrafficLoad for today of every counter and sends
+    the changed data points (the rows of the days) to the subscribers as
+    callback(id, row).
+
+    The interval of a counter is divided by speedup after a change and
+    multiplied by slowdown after a poll without changes, within
+    [min_interval, max_interval], so the quiet counters cost few requests.
+    The polls are made one by one from one thread and the first ones are
+    spread evenly over the interval, so they don't come in bursts; with
+    metrika.KeepAlive they go over one connection.
+
+    metrika.KeepAlive = True
+    poller = LoadPoller(metrika, ids)
+    poller.Subscribe(lambda id, row: alert(id, row['max_rps']))
+    poller.Start()
+    ...
+    poller.Stop()
+    """
+    def __init__(self, metrika, ids, interval=60, min_interval=15,
+        max_interval=900, speedup=2.0, slowdown=1.5, on_error=None):
+        ids = list(ids)
+        self.metrika = metrika
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.speedup = speedup
+        self.slowdown = slowdown
+        # on_error(id, exception), by default the error stops the poller
+        self.on_error = on_error
+        self._targets = dict([(id, _Target(id, interval)) for id in ids])
+        self._subscribers = []
+        self._stopped = threading.Event()
+        self._thread = None
+        self._queue = []
+        now = time.time()
+        for i, id in enumerate(ids):
+            self._queue.append((now + interval * float(i) / len(ids), id))
+        heapq.heapify(self._queue)
+
+    def Subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def Unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def Interval(self, id):
+        return self._targets[id].interval
+
+    def Poll(self, id):
+        """
+        Requests the load of today of the counter, sends the changed rows to
+        the subscribers and adjusts the interval of the counter. Returns
+        the changed rows.
+        """
+        target = self._targets[id]
+        today = datetime.date.today().strftime(DATE_FORMAT)
+        if target.date != today:
+            target.date = today
+            target.points = {}
+        page = self.metrika.GetStatTrafficLoad(id, date1=today, date2=today)
+
+        changed = []
+        for row in page.data:
+            key = row.get('date', today)
+            if target.points.get(key) != row:
+                target.points[key] = row
+                changed.append(row)
+
+        if changed:
+            target.interval /= self.speedup
+        else:
+            target.interval *= self.slowdown
+        target.interval = min(max(target.interval, self.min_interval),
+            self.max_interval)
+
+        for row in changed:
+            for callback in list(self._subscribers):
+                callback(id, row)
+        return changed
+
+    def Run(self):
+        """
+        Polls the counters when they are due until Stop().
+        """
+        while self._queue and not self._stopped.is_set():
+            due, id = self._queue[0]
+            wait = due - time.time()
+            if wait > 0:
+                self._stopped.wait(wait)
+                continue
+            heapq.heappop(self._queue)
+            try:
+                self.Poll(id)
+            except Exception as e:
+                if self.on_error is None:
+                    raise
+                target = self._targets[id]
+                target.interval = min(target.interval * self.slowdown,
+                    self.max_interval)
+                self.on_error(id, e)
+            heapq.heappush(self._queue,
+                (time.time() + self._targets[id].interval, id))
+
+    def Start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self.Run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def Stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        query
+# Purpose:     Query builder for the stat/v1/data endpoint
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+
+class StatQuery(object):
+    """
+    Builder of the parameters for the stat/v1/data endpoint of MetrikaV1.
+
+    query = StatQuery(ids=12345).Metrics('ym:s:visits', 'ym:s:users') \\
+        .Dimensions('ym:s:date').Dates('2016-01-01', '2016-01-31')
+    """
+    # limits of the API for one request
+    MAX_METRICS = 20
+    MAX_DIMENSIONS = 10
+    MAX_LIMIT = 100000
+
+    # rows requested with one page
+    PAGE_SIZE = 10000
+
+    def __init__(self, ids, metrics=(), dimensions=(), date1='', date2='',
+        filters='', sort=(), limit=None, **params):
+        if isinstance(ids, (list, tuple)):
+            ids = ','.join([str(id) for id in ids])
+        self.ids = str(ids)
+        self.metrics = list(metrics)
+        self.dimensions = list(dimensions)
+        self.date1 = date1
+        self.date2 = date2
+        self.filters = [filters] if filters else []
+        self.sort = list(sort)
+        # the whole number of rows wanted, None - all rows
+        self.limit = limit
+        self.page_size = self.PAGE_SIZE
+        self.params = params
+
+    def Metrics(self, *metrics):
+        self.metrics.extend(metrics)
+        return self
+
+    def Dimensions(self, *dimensions):
+        self.dimensions.extend(dimensions)
+        return self
+
+    def Filter(self, expression):
+        """
+        Adds the filter expression, all expressions are joined with AND.
+        """
+        self.filters.append(expression)
+        return self
+
+    def Sort(self, *fields):
+        """
+        Fields to sort by, a descending order is set with "-" before a field.
+        """
+        self.sort.extend(fields)
+        return self
+
+    def Dates(self, date1, date2=''):
+        self.date1 = date1
+        self.date2 = date2
+        return self
+
+    def Limit(self, limit):
+        self.limit = limit
+        return self
+
+    def PageSize(self, page_size):
+        self.page_size = min(page_size, self.MAX_LIMIT)
+        return self
+
+    def Param(self, name, value):
+        self.params[name] = value
+        return self
+
+    def Copy(self, metrics=None):
+        query = StatQuery(self.ids, self.metrics if metrics is None else metrics,
+            self.dimensions, self.date1, self.date2, sort=self.sort,
+            limit=self.limit, **self.params)
+        query.filters = list(self.filters)
+        query.page_size = self.page_size
+        return query
+
+    def Split(self):
+        """
+        Splits the query on the queries with no more than MAX_METRICS metrics.
+        The first query holds the metrics of the sort, so its order is
+        the order of the merged result.
+        """
+        # rows of the different dimensions can't be joined
+        if len(self.dimensions) > self.MAX_DIMENSIONS:
+            raise ValueError('Only %d dimensions are allowed in one query' %
+                self.MAX_DIMENSIONS)
+        if len(self.metrics) <= self.MAX_METRICS:
+            return [self]
+        sorted_metrics = [field.lstrip('-') for field in self.sort]
+        metrics = [m for m in self.metrics if m in sorted_metrics]
+        if len(metrics) > self.MAX_METRICS:
+            raise ValueError('Too many metrics to sort by')
+        metrics += [m for m in self.metrics if m not in sorted_metrics]
+        queries = []
+        for i in range(0, len(metrics), self.MAX_METRICS):
+            query = self.Copy(metrics[i:i + self.MAX_METRICS])
+            if queries:
+                # other chunks are matched by the dimensions, so they are
+                # fetched completely and sorted by the dimensions only
+                query.sort = [field for field in query.sort
+                    if field.lstrip('-') not in sorted_metrics]
+                query.limit = None
+            queries.append(query)
+        return queries
+
+    def GetParams(self, offset=1, limit=None):
+        params = dict(self.params)
+        params['ids'] = self.ids
+        params['metrics'] = ','.join(self.metrics)
+        if self.dimensions:
+            params['dimensions'] = ','.join(self.dimensions)
+        if self.date1:
+            params['date1'] = self.date1
+        if self.date2:
+            params['date2'] = self.date2
+        if len(self.filters) == 1:
+            params['filters'] = self.filters[0]
+        elif self.filters:
+            params['filters'] = ' AND '.join(['(%s)' % f for f in self.filters])
+        if self.sort:
+            params['sort'] = ','.join(self.sort)
+        params['offset'] = offset
+        params['limit'] = limit or self.page_size
+        return params
+
+    def GetOffsets(self, total):
+        """
+        Returns (offset, limit) of the pages after the first one.
+        """
+        if self.limit:
+            total = min(total, self.limit)
+        return [(offset, min(self.page_size, total - offset + 1))
+            for offset in range(1 + self.page_size, total + 1, self.page_size)]
+
+
+def _RowKey(row):
+    return tuple([(d.get('id'), d.get('name')) for d in row['dimensions']])
+
+
+def MergeResults(results):
+    """
+    Merges the results of the split query into one result, the metrics of
+    the rows are matched by the dimensions. Missing values are None.
+    The results are not changed.
+    """
+    result = dict(results[0])
+    result['query'] = dict(result['query'])
+    result['data'] = [dict(row) for row in result['data']]
+    for other in results[1:]:
+        metrics = other['query']['metrics']
+        index = dict([(_RowKey(row), row['metrics']) for row in other['data']])
+        missing = [None] * len(metrics)
+        for row in result['data']:
+            row['metrics'] = row['metrics'] + index.get(_RowKey(row), missing)
+        result['query']['metrics'] = result['query']['metrics'] + metrics
+        for name in ('totals', 'min', 'max'):
+            if name in result and name in other:
+                result[name] = result[name] + other[name]
+    return result
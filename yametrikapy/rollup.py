@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        rollup
+# Purpose:     Week, month, quarter and year aggregates from daily data
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+import datetime
+
+from .bundle import ParseDate, IsNumber, DATE_FORMAT
+from .paging import IterRows
+
+
+SUM = 'sum'
+MAX = 'max'
+
+# How the daily values are aggregated: SUM, MAX or the name of the metric
+# to weight an average by. The ratios (denial, depth, visit_time) are per
+# visit, so they are recomputed from their visits.
+AGGREGATES = {
+    'visits': SUM,
+    'page_views': SUM,
+    'new_visitors': SUM,
+    'denial': 'visits',
+    'depth': 'visits',
+    'visit_time': 'visits',
+    'max_rps': MAX,
+    'max_users': MAX,
+    # unique visitors of the days don't add up, use the API for them
+    'visitors': None,
+}
+
+GROUPS = ('day', 'week', 'month', 'quarter', 'year')
+
+
+def GetPeriodStart(date, group):
+    """
+    Returns the first date of the period of group which has the date.
+    """
+    if group == 'week':
+        return date - datetime.timedelta(days=date.weekday())
+    if group == 'month':
+        return date.replace(day=1)
+    if group == 'quarter':
+        return date.replace(month=(date.month - 1) // 3 * 3 + 1, day=1)
+    if group == 'year':
+        return date.replace(month=1, day=1)
+    return date
+
+
+class RollupStore(object):
+    """
+    Keeps the daily rows of the counters and computes the aggregates of
+    any group locally.
+
+    store = RollupStore()
+    store.Load(metrika, id, '20120101', '20121231')
+    months = store.Get(id, 'month')
+    """
+    def __init__(self, aggregates=AGGREGATES):
+        self.aggregates = aggregates
+        # (id, goal_id) -> {date: {metric: value}}
+        self._days = {}
+
+    def Add(self, id, rows, goal_id=None):
+        """
+        Adds the daily rows with the 'date' field, the metrics of the same
+        date are merged.
+        """
+        days = self._days.setdefault((id, goal_id), {})
+        for row in rows:
+            date = ParseDate(row['date'])
+            values = days.setdefault(date, {})
+            for name, value in row.items():
+                if IsNumber(value) and (self.aggregates.get(name, SUM) is not None):
+                    values[name] = value
+
+    def Load(self, metrika, id, date1, date2, goal_id=None):
+        """
+        Requests the daily traffic summary and load of the counter in
+        parallel and adds them.
+        """
+        def fetch(method):
+            kwargs = {'date1': date1, 'date2': date2, 'group': 'day'}
+            if (goal_id is not None) and (method != metrika.GetStatTrafficLoad):
+                kwargs['goal_id'] = goal_id
+            return list(IterRows(method, id, **kwargs))
+        for rows in metrika._Map(fetch,
+            [metrika.GetStatTrafficSummary, metrika.GetStatTrafficLoad]):
+            self.Add(id, rows, goal_id)
+
+    def Dates(self, id, goal_id=None):
+        return sorted(self._days.get((id, goal_id), {}))
+
+    def Get(self, id, group='week', date1=None, date2=None, goal_id=None):
+        """
+        Returns the rows of the periods of group ('day', 'week', 'month',
+        'quarter', 'year') sorted by date, the date of a row is the first
+        date of its period as 'YYYYMMDD'.
+        """
+        if group not in GROUPS:
+            raise ValueError('Unknown group "%s"' % group)
+        date1 = ParseDate(date1) if date1 else None
+        date2 = ParseDate(date2) if date2 else None
+
+        periods = {}
+        for date, values in self._days.get((id, goal_id), {}).items():
+            if (date1 and date < date1) or (date2 and date > date2):
+                continue
+            start = GetPeriodStart(date, group)
+            periods.setdefault(start, []).append(values)
+
+        result = []
+        for start in sorted(periods):
+            row = self._Aggregate(periods[start])
+            row['date'] = start.strftime(DATE_FORMAT)
+            result.append(row)
+        return result
+
+    def _Aggregate(self, days):
+        sums = {}
+        weights = {}
+        for values in days:
+            for name, value in values.items():
+                aggregate = self.aggregates.get(name, SUM)
+                if aggregate == SUM:
+                    sums[name] = sums.get(name, 0) + value
+                elif aggregate == MAX:
+                    sums[name] = max(sums.get(name, value), value)
+                else:
+                    weight = values.get(aggregate) or 0
+                    sums[name] = sums.get(name, 0) + value * weight
+                    weights[name] = weights.get(name, 0) + weight
+        for name, weight in weights.items():
+            sums[name] = float(sums[name]) / weight if weight else 0.0
+        return sums
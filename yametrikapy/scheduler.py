@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        scheduler
+# Purpose:     Priority scheduling of the requests sharing one quota
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+import heapq
+import itertools
+import threading
+import time
+
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+
+
+class PriorityClass(object):
+    """
+    Class of the requests: a lower priority number goes first, limit is
+    the maximum number of the running requests of the class.
+    """
+    def __init__(self, name, priority, limit=None):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.running = 0
+        self.requests = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        # virtual time of the weighted fair queuing
+        self.time = 0.0
+        self.finish = {}
+        self.queue = []
+
+
+class _Waiter(object):
+    def __init__(self):
+        self.ready = threading.Event()
+        self.queued = time.time()
+
+
+class Scheduler(object):
+    """
+    Runs at most concurrency requests at a time. Waiting requests get
+    the free slots by the priority of their class; inside a class the tenants
+    (counters by default) share the slots by their weights, so one big
+    export doesn't hold back the others.
+
+    metrika.Scheduler = Scheduler(8)
+    with metrika.WithPriority(INTERACTIVE):
+        metrika.GetCounter(id)
+    """
+    def __init__(self, concurrency=8, classes=None):
+        self.concurrency = concurrency
+        if classes is None:
+            classes = [PriorityClass(INTERACTIVE, 0),
+                PriorityClass(BATCH, 1, max(1, concurrency * 3 // 4))]
+        self.classes = dict([(c.name, c) for c in classes])
+        self.running = 0
+        self._lock = threading.Lock()
+        self._order = itertools.count()
+
+    def _Dispatch(self):
+        classes = sorted(self.classes.values(), key=lambda c: c.priority)
+        while self.running < self.concurrency:
+            for c in classes:
+                if c.queue and ((c.limit is None) or (c.running < c.limit)):
+                    break
+            else:
+                return
+            tag, order, waiter = heapq.heappop(c.queue)
+            c.time = tag
+            c.running += 1
+            self.running += 1
+            waited = time.time() - waiter.queued
+            c.wait_time += waited
+            c.max_wait_time = max(c.max_wait_time, waited)
+            waiter.ready.set()
+
+    def _Release(self, c):
+        with self._lock:
+            c.running -= 1
+            self.running -= 1
+            self._Dispatch()
+
+    def Run(self, f, priority=BATCH, tenant=None, weight=1, deadline=None):
+        """
+        Waits for the slot and calls f in the current thread.
+        deadline - client.Deadline, checked while waiting.
+        """
+        c = self.classes[priority]
+        waiter = _Waiter()
+        with self._lock:
+            tag = max(c.time, c.finish.get(tenant, 0.0)) + 1.0 / weight
+            c.finish[tenant] = tag
+            c.requests += 1
+            heapq.heappush(c.queue, (tag, next(self._order), waiter))
+            self._Dispatch()
+
+        try:
+            if deadline is None:
+                waiter.ready.wait()
+            else:
+                deadline.wait(waiter.ready)
+        except:
+            with self._lock:
+                if waiter.ready.is_set():
+                    granted = True
+                else:
+                    granted = False
+                    c.queue = [item for item in c.queue if item[2] is not waiter]
+                    heapq.heapify(c.queue)
+            if granted:
+                self._Release(c)
+            raise
+
+        try:
+            return f()
+        finally:
+            self._Release(c)
+
+    def Stats(self):
+        """
+        Returns {class: {'queued', 'running', 'requests', 'avg_wait',
+        'max_wait'}}, the times are in seconds.
+        """
+        with self._lock:
+            stats = {}
+            for c in self.classes.values():
+                served = c.requests - len(c.queue)
+                stats[c.name] = {
+                    'queued': len(c.queue),
+                    'running': c.running,
+                    'requests': c.requests,
+                    'avg_wait': c.wait_time / served if served else 0.0,
+                    'max_wait': c.max_wait_time
+                }
+            return stats
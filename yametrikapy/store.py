@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        store
+# Purpose:     SQLite store of the statistics of Metrika
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+import re
+import sqlite3
+import threading
+
+from simplejson import dumps
+
+from .bundle import REPORTS
+from .core import Metrika
+from .paging import IterPages, IterRows
+
+
+def _GetTables():
+    """
+    Returns {table: endpoint} for every report of Metrika, the table of
+    'stat/sources/phrases' is 'sources_phrases'.
+    """
+    endpoints = [value for name, value in vars(Metrika).items()
+        if name.startswith('_STAT_')]
+    tables = {}
+    for endpoint in endpoints:
+        # skip the sections like 'stat/traffic'
+        if [e for e in endpoints if e.startswith(endpoint + '/')]:
+            continue
+        tables[endpoint[len(Metrika._STAT) + 1:].replace('/', '_')] = endpoint
+    return tables
+
+TABLES = _GetTables()
+
+_COLUMNS = (
+    ('counter_id', 'INTEGER NOT NULL'),
+    ('goal_id', 'INTEGER'),
+    ('date1', 'TEXT'),
+    ('date2', 'TEXT'),
+    ('date', 'TEXT'),
+)
+
+
+def _Normalize(name):
+    return name.replace('_', '').lower()
+
+
+def GetTable(method):
+    """
+    Returns the table of the Metrika.GetStat* method or its name.
+    """
+    name = getattr(method, '__name__', method)
+    if name.startswith('GetStat'):
+        name = name[len('GetStat'):]
+    for table in TABLES:
+        if _Normalize(table) == _Normalize(name):
+            return table
+    raise ValueError('No table for "%s"' % name)
+
+
+# The fields of the responses with the rows of the reports which don't
+# have them in 'data', the rows of every field are saved with the name of
+# the field in the column 'section'
+SECTIONS = dict([(GetTable(report.method), report.data) for report in REPORTS
+    if tuple(report.data) != ('data',)])
+
+
+class StatStore(object):
+    """
+    Statistics in SQLite, one table per report with the indexes on
+    the counter, goal and date. The fields of rows become the columns of
+    the table as they appear, nested values are kept as JSON.
+
+    store = StatStore('stat.db')
+    store.Fetch(metrika.GetStatSourcesPhrases, id, date1='20120101',
+        date2='20120131')
+    rows = store.Query('SELECT phrase, SUM(visits) FROM sources_phrases '
+        'GROUP BY phrase ORDER BY 2 DESC LIMIT 10')
+    """
+    BATCH_SIZE = 1000
+
+    _NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+    def __init__(self, path=':memory:'):
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._columns = {}
+        with self._lock:
+            for table in sorted(TABLES):
+                self._CreateTable(table)
+
+    def _CreateTable(self, table):
+        self._db.execute('CREATE TABLE IF NOT EXISTS %s (%s)' % (table,
+            ', '.join(['%s %s' % column for column in _COLUMNS])))
+        for column in ('counter_id', 'goal_id', 'date'):
+            self._db.execute('CREATE INDEX IF NOT EXISTS %s_%s ON %s (%s)' %
+                (table, column, table, column))
+        self._db.commit()
+        self._columns[table] = set([row[1] for row in
+            self._db.execute('PRAGMA table_info(%s)' % table)])
+
+    def _AddColumns(self, table, names):
+        for name in names:
+            if name in self._columns[table]:
+                continue
+            if not self._NAME.match(name):
+                raise ValueError('Invalid column name "%s"' % name)
+            self._db.execute('ALTER TABLE %s ADD COLUMN "%s"' % (table, name))
+            self._columns[table].add(name)
+
+    def Save(self, table, id, rows, goal_id=None, date1='', date2=''):
+        """
+        Inserts the rows of the report in the transactions of BATCH_SIZE
+        rows. Returns the number of the rows.
+        """
+        if table not in TABLES:
+            raise ValueError('Unknown table "%s"' % table)
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.BATCH_SIZE:
+                count += self._Insert(table, id, batch, goal_id, date1, date2)
+                batch = []
+        if batch:
+            count += self._Insert(table, id, batch, goal_id, date1, date2)
+        return count
+
+    def _Insert(self, table, id, rows, goal_id, date1, date2):
+        fields = set()
+        for row in rows:
+            fields.update(row.keys())
+        fields.discard('date')
+        fields = sorted(fields - set([name for name, type in _COLUMNS]))
+        names = [name for name, type in _COLUMNS] + fields
+        sql = 'INSERT INTO %s (%s) VALUES (%s)' % (table,
+            ', '.join(['"%s"' % name for name in names]),
+            ', '.join(['?'] * len(names)))
+
+        values = []
+        for row in rows:
+            value = [id, goal_id, date1, date2, row.get('date')]
+            for name in fields:
+                v = row.get(name)
+                if isinstance(v, (list, dict)):
+                    v = dumps(v)
+                value.append(v)
+            values.append(value)
+
+        with self._lock:
+            self._AddColumns(table, fields)
+            with self._db:
+                self._db.executemany(sql, values)
+        return len(values)
+
+    def Fetch(self, method, id, goal_id=None, date1='', date2='', **kwargs):
+        """
+        Requests all pages of the report with the Metrika.GetStat* method
+        and saves them.
+        """
+        if goal_id is not None:
+            kwargs['goal_id'] = goal_id
+        table = GetTable(method)
+        if table in SECTIONS:
+            rows = self._IterSections(method, SECTIONS[table], id,
+                date1=date1, date2=date2, **kwargs)
+        else:
+            rows = IterRows(method, id, date1=date1, date2=date2, **kwargs)
+        return self.Save(table, id, rows, goal_id, date1, date2)
+
+    def _IterSections(self, method, sections, *args, **kwargs):
+        for page in IterPages(method, *args, **kwargs):
+            for section in sections:
+                for row in getattr(page, section, None) or []:
+                    row = dict(row)
+                    row['section'] = section
+                    yield row
+
+    def Query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def Select(self, table, id=None, goal_id=None, date1=None, date2=None):
+        """
+        Returns the rows of the table for the counter, goal and the dates
+        of the rows (or of the requests for the reports without dates).
+        """
+        if table not in TABLES:
+            raise ValueError('Unknown table "%s"' % table)
+        where = []
+        params = []
+        if id is not None:
+            where.append('counter_id = ?')
+            params.append(id)
+        if goal_id is not None:
+            where.append('goal_id = ?')
+            params.append(goal_id)
+        if date1:
+            where.append('COALESCE(date, date1) >= ?')
+            params.append(date1)
+        if date2:
+            where.append('COALESCE(date, date2) <= ?')
+            params.append(date2)
+        sql = 'SELECT * FROM %s' % table
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        return self.Query(sql, params)
+
+    def Close(self):
+        with self._lock:
+            self._db.close()
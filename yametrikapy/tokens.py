@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        tokens
+# Purpose:     Load balancing of requests between several OAuth tokens
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+import threading
+import time
+from contextlib import contextmanager
+
+from .core import Metrika, TooManyRequestsError
+
+
+class NoTokenError(Exception):
+    pass
+
+
+class TokenState(object):
+    """
+    Load and rate limit state of one token.
+    """
+    def __init__(self, token, metrika):
+        self.token = token
+        self.metrika = metrika
+        self.counters = set()
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        # the time before which the token is not used
+        self.blocked_until = 0.0
+        # the time of the next request allowed by the rate
+        self.next_request = 0.0
+
+
+class TokenPool(object):
+    """
+    Several tokens with the counters they have access to. Every request of
+    a counter goes to the least loaded token which has the counter, so
+    an export uses the quota of all accounts.
+
+    rate - requests per second for one token, None - no limit.
+    cooldown - seconds the token is not used after 429 "Too many requests".
+
+    pool = TokenPool(['token1', 'token2'])
+    pool.Discover()
+    data = pool.Call(id, 'GetStatTrafficSummary', id, date1='20120101')
+    """
+    def __init__(self, tokens, client_id='', rate=None, cooldown=60):
+        self.rate = rate
+        self.cooldown = cooldown
+        self._lock = threading.Condition(threading.Lock())
+        self._states = [TokenState(token, Metrika(client_id, token=token))
+            for token in tokens]
+
+    def Discover(self):
+        """
+        Requests the counters of every token in parallel.
+        """
+        metrika = self._states[0].metrika
+        lists = metrika._Map(lambda state: state.metrika.GetCounterList(),
+            self._states)
+        with self._lock:
+            for state, result in zip(self._states, lists):
+                state.counters = set([c['id'] for c in result.counters])
+
+    def GetTokens(self, counter_id):
+        return [state.token for state in self._states
+            if counter_id in state.counters]
+
+    def _Choose(self, counter_id):
+        states = [state for state in self._states if counter_id in state.counters]
+        if not states:
+            raise NoTokenError('No token has access to the counter %s' % counter_id)
+        while True:
+            now = time.time()
+            ready = [state for state in states if (state.blocked_until <= now) and
+                (state.next_request <= now)]
+            if ready:
+                return min(ready, key=lambda s: (s.in_flight, s.requests))
+            wait = min([max(s.blocked_until, s.next_request) for s in states])
+            self._lock.wait(max(wait - now, 0.01))
+
+    @contextmanager
+    def Acquire(self, counter_id):
+        """
+        Gives the Metrika of the least loaded token for the counter.
+
+        with pool.Acquire(id) as metrika:
+            metrika.GetCounter(id)
+        """
+        with self._lock:
+            state = self._Choose(counter_id)
+            state.in_flight += 1
+            state.requests += 1
+            if self.rate:
+                state.next_request = max(state.next_request, time.time()) + \
+                    1.0 / self.rate
+        try:
+            yield state.metrika
+        except TooManyRequestsError:
+            with self._lock:
+                state.throttled += 1
+                state.blocked_until = time.time() + self.cooldown
+            raise
+        finally:
+            with self._lock:
+                state.in_flight -= 1
+                self._lock.notify_all()
+
+    def Call(self, counter_id, method, *args, **kwargs):
+        """
+        Calls the method of Metrika by name with the token for the counter.
+        A request rejected with 429 is repeated with the other tokens.
+        """
+        attempts = max(len(self.GetTokens(counter_id)), 1)
+        for attempt in range(attempts):
+            try:
+                with self.Acquire(counter_id) as metrika:
+                    return getattr(metrika, method)(*args, **kwargs)
+            except TooManyRequestsError:
+                if attempt == attempts - 1:
+                    raise
+
+    def Stats(self):
+        """
+        Returns {token: (in flight, requests, throttled)}.
+        """
+        with self._lock:
+            return dict([(s.token, (s.in_flight, s.requests, s.throttled))
+                for s in self._states])
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+#-------------------------------------------------------------------------------
+# Name:        tree
+# Purpose:     Indexed results of the reports in the tree mode
+#
+# Created:     19.10.2026
+# Licence:     MIT
+#-------------------------------------------------------------------------------
+
+from array import array
+
+from .paging import IterRows
+
+
+class StatTree(object):
+    """
+    Rows of a report with table_mode='tree' (geo, regions of Direct,
+    sites, ...) as flat arrays: the nodes are numbered in the breadth-first
+    order, so the children of a node are a range of numbers, and every node
+    has the number of its parent. The lookup by id goes through the dict.
+
+    The nested rows are added to the arrays only when they are needed:
+    the lookup of an id expands the levels until the id is found.
+
+    tree = FetchTree(metrika.GetStatGeo, id, date1='20120101')
+    tree.Children(225)
+    tree.Aggregate(225, 'visits')
+    """
+    def __init__(self, rows, key='id', children='chld'):
+        self.key = key
+        self.children = children
+        self._rows = []
+        self._index = {}
+        self._parent = array('l')
+        self._depth = array('l')
+        # the range of the children of a node, set when it's expanded
+        self._start = array('l')
+        self._end = array('l')
+        self._expanded = 0
+        self._totals = {}
+        self._roots = len(rows)
+        for row in rows:
+            self._Append(row, -1, 0)
+
+    def _Append(self, row, parent, depth):
+        self._index[row.get(self.key)] = len(self._rows)
+        self._rows.append(row)
+        self._parent.append(parent)
+        self._depth.append(depth)
+        self._start.append(-1)
+        self._end.append(-1)
+
+    def _ExpandNext(self):
+        i = self._expanded
+        self._start[i] = len(self._rows)
+        for row in self._rows[i].get(self.children) or []:
+            self._Append(row, i, self._depth[i] + 1)
+        self._end[i] = len(self._rows)
+        self._expanded += 1
+
+    def _ExpandAll(self):
+        while self._expanded < len(self._rows):
+            self._ExpandNext()
+
+    def _Find(self, id):
+        i = self._index.get(id)
+        while (i is None) and (self._expanded < len(self._rows)):
+            self._ExpandNext()
+            i = self._index.get(id)
+        if i is None:
+            raise KeyError(id)
+        return i
+
+    def _ChildRange(self, i):
+        while self._expanded <= i:
+            self._ExpandNext()
+        return range(self._start[i], self._end[i])
+
+    def _Id(self, i):
+        return self._rows[i].get(self.key)
+
+    def __contains__(self, id):
+        try:
+            self._Find(id)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        self._ExpandAll()
+        return len(self._rows)
+
+    def Get(self, id):
+        """
+        Returns the row of the node without its children.
+        """
+        row = self._rows[self._Find(id)]
+        return dict([(name, value) for name, value in row.items()
+            if name != self.children])
+
+    def Roots(self):
+        return [self._Id(i) for i in range(self._roots)]
+
+    def Parent(self, id):
+        i = self._parent[self._Find(id)]
+        return self._Id(i) if i >= 0 else None
+
+    def Depth(self, id):
+        return self._depth[self._Find(id)]
+
+    def Children(self, id):
+        return [self._Id(i) for i in self._ChildRange(self._Find(id))]
+
+    def Path(self, id):
+        """
+        Returns the ids from the root to the node.
+        """
+        path = []
+        i = self._Find(id)
+        while i >= 0:
+            path.append(self._Id(i))
+            i = self._parent[i]
+        path.reverse()
+        return path
+
+    def Subtree(self, id):
+        """
+        Returns the ids of the node and all its descendants, depth-first.
+        """
+        result = []
+        stack = [self._Find(id)]
+        while stack:
+            i = stack.pop()
+            result.append(self._Id(i))
+            stack.extend(reversed(self._ChildRange(i)))
+        return result
+
+    def Totals(self, metric):
+        """
+        Returns the array of the sums of the metric over the leaves of
+        the subtree of every node, in the order of the nodes. It's computed
+        once for the metric.
+        """
+        totals = self._totals.get(metric)
+        if totals is None:
+            self._ExpandAll()
+            totals = array('d', [0.0]) * len(self._rows)
+            # the children always come after their parent
+            for i in range(len(self._rows) - 1, -1, -1):
+                if self._start[i] == self._end[i]:
+                    totals[i] += self._rows[i].get(metric) or 0
+                if self._parent[i] >= 0:
+                    totals[self._parent[i]] += totals[i]
+            totals = self._totals[metric] = totals
+        return totals
+
+    def Aggregate(self, id, metric):
+        """
+        Returns the sum of the metric over the leaves of the subtree of
+        the node.
+        """
+        return self.Totals(metric)[self._Find(id)]
+
+    def Flatten(self):
+        """
+        Yields the rows of all nodes without the children and with
+        'parent_id' and 'depth', the parents come first.
+        """
+        self._ExpandAll()
+        for i in range(len(self._rows)):
+            row = dict([(name, value) for name, value in self._rows[i].items()
+                if name != self.children])
+            parent = self._parent[i]
+            row['parent_id'] = self._Id(parent) if parent >= 0 else None
+            row['depth'] = self._depth[i]
+            yield row
+
+
+def FetchTree(method, id, key='id', children='chld', **kwargs):
+    """
+    Requests all pages of the report with table_mode='tree' and returns
+    the StatTree of the rows.
+
+    method - one of the Metrika.GetStat* methods with table_mode.
+    """
+    kwargs['table_mode'] = 'tree'
+    return StatTree(list(IterRows(method, id, **kwargs)), key, children)